@@ -0,0 +1,96 @@
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import glob
+import time
+import random
+import argparse
+import ist_utils
+from transfer import IST
+from transform.lang import set_query
+from transform.query import query_sources
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+default_files = {
+    "c": ["test_code/test.c", "tree-sitter-c/examples/*.c"],
+    "java": ["test_code/*.java"],
+}
+
+
+def load_codes(language, files):
+    codes = []
+    for pattern in files or default_files[language]:
+        for path in sorted(glob.glob(os.path.join(parent_dir, pattern))):
+            with open(path, "r", encoding="utf-8") as f:
+                codes.append((os.path.relpath(path, parent_dir), f.read()))
+    return codes
+
+
+def time_matcher(match_func, roots, repeat):
+    # Best time over repeat runs of match_func on every root. The node index of
+    # find_nodes is dropped before each run so that its walk is paid for too.
+    best, matches = None, None
+    for _ in range(repeat):
+        random.seed(0)
+        ist_utils.node_indexes.clear()
+        start = time.perf_counter()
+        res = [match_func(root) for root in roots]
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+        matches = res
+    return best, matches
+
+
+def bench(language, files=None, repeat=5):
+    ist = IST(language)
+    codes = load_codes(language, files)
+    roots = [ist.parse(code).root_node for _, code in codes]
+    print(f"{language}: {len(codes)} files, {sum(len(c) for _, c in codes)} chars")
+    print(f"{'style':<8}{'matcher':<34}{'legacy(ms)':>12}{'query(ms)':>12}{'speedup':>9}  same")
+
+    seen = set()
+    for style, (style_type, style_subtype) in ist.style_dict.items():
+        operator = ist.op.get(style_type, {}).get(style_subtype)
+        if not operator or operator[0] in seen:
+            continue
+        match_func = operator[0]
+        seen.add(match_func)
+
+        try:
+            set_query(None)
+            legacy_time, legacy_matches = time_matcher(match_func, roots, repeat)
+            set_query(ist.get_query)
+            query_time, query_matches = time_matcher(match_func, roots, repeat)
+        except Exception as e:
+            print(f"{style:<8}{match_func.__name__:<34}  failed: {type(e).__name__}: {e}")
+            continue
+        finally:
+            set_query(ist.get_query)
+
+        same = [[n.id for n in m] for m in legacy_matches] == [
+            [n.id for n in m] for m in query_matches
+        ]
+        speedup = legacy_time / query_time if query_time else float("inf")
+        print(
+            f"{style:<8}{match_func.__name__:<34}{legacy_time * 1000:>12.2f}"
+            f"{query_time * 1000:>12.2f}{speedup:>8.2f}x  {'yes' if same else 'NO'}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the query-backed matchers with the legacy node walks, per style."
+    )
+    parser.add_argument("--lang", type=str, nargs="+", default=["c", "java"],
+                        choices=["c", "java"], help="Languages to benchmark")
+    parser.add_argument("--files", type=str, nargs="+",
+                        help="Source files (glob patterns) to match on, instead of the bundled examples")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Runs per matcher, the best one is reported (default: 5)")
+    args = parser.parse_args()
+
+    print(f"queries: {', '.join(query_sources)}")
+    for language in args.lang:
+        bench(language, args.files, args.repeat)
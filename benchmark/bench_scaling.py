@@ -0,0 +1,151 @@
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import json
+import math
+import time
+import random
+import argparse
+import ist_utils
+from transfer import IST
+from gen_corpus import generate_program
+
+# Values of each axis of ProgramGenerator that the programs are generated at
+default_values = {
+    "functions": [2, 4, 8, 16, 32, 64],
+    "depth": [0, 1, 2, 3, 4, 5],
+    "density": [0.1, 0.2, 0.4, 0.6, 0.8, 1.0],
+    "identifiers": [4, 8, 16, 32, 64, 128],
+    "bytes": [2000, 4000, 8000, 16000, 32000, 64000],
+}
+axis_params = {"bytes": "target_bytes"}
+
+
+def time_best(func, code, ist, repeat):
+    # Best time of func(code) over repeat calls, each from dropped parse trees and node indexes
+    best = None
+    for _ in range(repeat):
+        ist.trees.clear()
+        ist_utils.node_indexes.clear()
+        random.seed(0)
+        start = time.perf_counter()
+        func(code)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def growth_exponent(sizes, times):
+    # Slope of the least-squares line through (log size, log time): time grows
+    # like size ** exponent, 1 being linear
+    points = [(math.log(s), math.log(t)) for s, t in zip(sizes, times) if s > 0 and t > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+
+def bench(language, axis, values, styles=None, repeat=3, seed=0, time_limit=60.0):
+    # Time of each style (and get_style, tokenize) on the programs generated at
+    # values of axis, with its growth exponent in the program size. A style
+    # whose time passes time_limit is not run on the larger programs.
+    ist = IST(language)
+    programs = [generate_program(language, seed=seed, **{axis_params.get(axis, axis): value}) for value in values]
+    sizes = [len(code.encode("utf-8")) for code in programs]
+    print(f"{language}, {axis}: {', '.join(f'{v} ({s} bytes)' for v, s in zip(values, sizes))}")
+    print(f"{'style':<10}{'exponent':>8}  time (ms) per program")
+
+    benchmarks = [(style, lambda code, style=style: ist.transfer([style], code))
+                  for style in styles or ist.style_dict]
+    benchmarks.append(("get_style", lambda code: ist.get_style(code)))
+    benchmarks.append(("tokenize", lambda code: ist.tokenize(code)))
+
+    results = {}
+    for name, func in benchmarks:
+        times = []
+        try:
+            func(programs[0])
+            for code in programs:
+                elapsed = time_best(func, code, ist, repeat)
+                times.append(elapsed)
+                if elapsed > time_limit:
+                    break
+        except Exception as e:
+            print(f"{name:<10}  failed: {type(e).__name__}: {e}")
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        exponent = growth_exponent(sizes[:len(times)], times)
+        results[name] = {
+            "sizes": sizes[:len(times)],
+            "times_ms": [round(t * 1000, 4) for t in times],
+            "exponent": round(exponent, 3) if exponent is not None else None,
+        }
+        flag = "  super-linear" if exponent is not None and exponent > 1.3 else ""
+        exponent_text = f"{exponent:.2f}" if exponent is not None else "-"
+        print(f"{name:<10}{exponent_text:>8}  " + " ".join(f"{t * 1000:>9.2f}" for t in times) + flag)
+    return {"axis": axis, "values": values, "sizes": sizes, "results": results}
+
+
+def plot(report, path):
+    # Log-log plot of time against program size, one line per style
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    runs = list(report["runs"].items())
+    fig, axes = plt.subplots(1, len(runs), figsize=(7 * len(runs), 6), squeeze=False)
+    for ax, (language, run) in zip(axes[0], runs):
+        for name, result in run["results"].items():
+            if "times_ms" in result and len(result["times_ms"]) > 1:
+                ax.loglog(result["sizes"], result["times_ms"], marker=".", label=f"{name} ({result['exponent']})")
+        ax.set_title(f"{language}: time vs size ({run['axis']})")
+        ax.set_xlabel("program size (bytes)")
+        ax.set_ylabel("time (ms)")
+        ax.legend(fontsize=6, ncol=2)
+    fig.tight_layout()
+    fig.savefig(path)
+    print(f"Plot saved to: {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time every style on synthetic programs of growing size and fit its growth exponent."
+    )
+    parser.add_argument("--lang", type=str, nargs="+", default=["c", "java"],
+                        choices=["c", "java", "c_sharp"], help="Languages to benchmark")
+    parser.add_argument("--axis", type=str, default="bytes", choices=list(default_values),
+                        help="Parameter of the generated programs to scale (default: bytes)")
+    parser.add_argument("--values", type=float, nargs="+",
+                        help="Values of the axis to generate programs at (default: a doubling series)")
+    parser.add_argument("--styles", type=str, nargs="+",
+                        help="Styles to benchmark (default: every key of IST.style_dict)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Calls per program and style, the best one is reported (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated programs (default: 0)")
+    parser.add_argument("--time_limit", type=float, default=60.0,
+                        help="Seconds after which a style is not run on larger programs (default: 60)")
+    parser.add_argument("--output", type=str, default="bench_scaling.json",
+                        help="Where to save the results as JSON (default: bench_scaling.json)")
+    parser.add_argument("--plot", type=str,
+                        help="Also save a log-log plot of time vs size to this image (needs matplotlib)")
+    args = parser.parse_args()
+
+    sys.setrecursionlimit(10000)
+    values = args.values or default_values[args.axis]
+    if args.axis != "density":
+        values = [int(v) for v in values]
+    report = {"repeat": args.repeat, "seed": args.seed, "runs": {}}
+    for language in args.lang:
+        report["runs"][language] = bench(language, args.axis, values, args.styles, args.repeat, args.seed,
+                                         args.time_limit)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {args.output}")
+    if args.plot:
+        plot(report, args.plot)
@@ -0,0 +1,186 @@
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import json
+import time
+import random
+import argparse
+import platform
+import ist_utils
+from transfer import IST
+from bench_matchers import load_codes
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+default_files = {
+    "c": ["test_code/*.c"],
+    "java": ["test_code/*.java"],
+}
+
+
+def load_dataset_codes(dataset, code_field, max_samples=None):
+    # (name, code) of the records of a jsonl dataset
+    codes = []
+    with open(dataset, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if max_samples is not None and len(codes) >= max_samples:
+                break
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(data.get(code_field), str) and data[code_field].strip():
+                codes.append((f"{os.path.basename(dataset)}:{i}", data[code_field]))
+    return codes
+
+
+def percentile(values, q):
+    # Nearest-rank percentile of the sorted values
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * q // 100))
+    return values[int(rank) - 1]
+
+
+def time_calls(func, codes, ist, repeat):
+    # Latencies of func(code) for every code, repeat times each. The parse
+    # trees and node indexes are dropped before each call, so every call pays
+    # for its parse as a fresh sample in a batch run would. An untimed call
+    # first compiles the queries and imports the modules func uses.
+    if codes:
+        func(codes[0][1])
+    latencies = []
+    for _ in range(repeat):
+        for _, code in codes:
+            ist.trees.clear()
+            ist_utils.node_indexes.clear()
+            random.seed(0)
+            start = time.perf_counter()
+            func(code)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(latencies, code_bytes, repeat):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    ms = lambda seconds: round(seconds * 1000, 4) if seconds is not None else None
+    return {
+        "calls": len(latencies),
+        "mean_ms": ms(total / len(latencies)),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p90_ms": ms(percentile(latencies, 90)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1]),
+        "samples_per_s": round(len(latencies) / total, 2) if total else None,
+        "kb_per_s": round(code_bytes * repeat / 1024 / total, 2) if total else None,
+    }
+
+
+def bench(language, codes, repeat=5, styles=None):
+    # Results of every style of IST.style_dict (or styles), get_style and
+    # tokenize on codes, by name
+    ist = IST(language)
+    code_bytes = sum(len(code.encode("utf-8")) for _, code in codes)
+    print(f"{language}: {len(codes)} samples, {code_bytes} bytes")
+    print(f"{'style':<10}{'mean(ms)':>10}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'samples/s':>11}")
+
+    benchmarks = [(style, lambda code, style=style: ist.transfer([style], code))
+                  for style in styles or ist.style_dict]
+    benchmarks.append(("get_style", lambda code: ist.get_style(code)))
+    benchmarks.append(("tokenize", lambda code: ist.tokenize(code)))
+
+    results = {}
+    for name, func in benchmarks:
+        try:
+            latencies = time_calls(func, codes, ist, repeat)
+        except Exception as e:
+            print(f"{name:<10}  failed: {type(e).__name__}: {e}")
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        result = summarize(latencies, code_bytes, repeat)
+        results[name] = result
+        print(f"{name:<10}{result['mean_ms']:>10.2f}{result['p50_ms']:>10.2f}{result['p90_ms']:>10.2f}"
+              f"{result['p99_ms']:>10.2f}{result['samples_per_s']:>11.1f}")
+    return results
+
+
+def compare(results, baseline, metric="p50_ms", threshold=0.1):
+    # Entries of results whose metric is more than threshold (relative) above
+    # the baseline: [(language, name, baseline value, value)]
+    regressions = []
+    print(f"\n{'lang':<6}{'style':<10}{'baseline':>10}{'current':>10}{'change':>10}")
+    for language, entries in results.items():
+        for name, result in entries.items():
+            old = baseline.get(language, {}).get(name, {}).get(metric)
+            new = result.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            flag = "  REGRESSION" if change > threshold else ""
+            print(f"{language:<6}{name:<10}{old:>10.2f}{new:>10.2f}{change:>+10.1%}{flag}")
+            if flag:
+                regressions.append((language, name, old, new))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Latency and throughput of every style, get_style and tokenize, per language."
+    )
+    parser.add_argument("--lang", type=str, nargs="+", default=["c", "java"],
+                        choices=["c", "java"], help="Languages to benchmark")
+    parser.add_argument("--files", type=str, nargs="+",
+                        help="Source files (glob patterns) to benchmark on, instead of test_code/")
+    parser.add_argument("--dataset", type=str,
+                        help="jsonl dataset whose code field is benchmarked on, instead of source files")
+    parser.add_argument("--code_field", type=str, default="func",
+                        help="Field of --dataset holding the code (default: func)")
+    parser.add_argument("--max_samples", type=int,
+                        help="Records of --dataset to use (default: all)")
+    parser.add_argument("--styles", type=str, nargs="+",
+                        help="Styles to benchmark (default: every key of IST.style_dict)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Calls per sample and style (default: 5)")
+    parser.add_argument("--output", type=str, default="bench_styles.json",
+                        help="Where to save the results as JSON (default: bench_styles.json)")
+    parser.add_argument("--baseline", type=str,
+                        help="Results JSON of an earlier run to compare with")
+    parser.add_argument("--metric", type=str, default="p50_ms",
+                        choices=["mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms"],
+                        help="Latency compared with the baseline (default: p50_ms)")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative slowdown over the baseline reported as a regression (default: 0.1)")
+    args = parser.parse_args()
+
+    sys.setrecursionlimit(10000)
+    results = {}
+    for language in args.lang:
+        if args.dataset:
+            codes = load_dataset_codes(args.dataset, args.code_field, args.max_samples)
+        else:
+            codes = load_codes(language, args.files or default_files[language])
+        results[language] = bench(language, codes, args.repeat, args.styles)
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "corpus": args.dataset or args.files or default_files,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.metric, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions above {args.threshold:.0%}.")
+            sys.exit(1)
+        print("No regressions.")
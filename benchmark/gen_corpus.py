@@ -0,0 +1,119 @@
+import sys
+import random
+import argparse
+
+
+class ProgramGenerator:
+    # Random but valid C, Java or C# programs whose size and shape scale along
+    # separate axes: number of functions, nesting depth of the statements,
+    # density of the loops/ifs/switches among them, number of local variables
+    # per function, and (with target_bytes) the size of the file
+    def __init__(self, language="c", functions=10, depth=2, density=0.5, identifiers=8,
+                 statements=4, target_bytes=None, seed=0):
+        self.language = language
+        self.functions = functions
+        self.depth = depth
+        self.density = density
+        self.identifiers = identifiers
+        self.statements = statements
+        self.target_bytes = target_bytes
+        self.random = random.Random(seed)
+
+    def generate(self):
+        body = []
+        size = 0
+        n = 0
+        more = lambda: n < self.functions if self.target_bytes is None else size < self.target_bytes
+        while more():
+            function = self.function(n)
+            body.append(function)
+            size += len(function.encode("utf-8")) + 1
+            n += 1
+        if self.language == "c":
+            return "\n".join(body)
+        indent = lambda code: "\n".join("    " + line if line else line for line in code.split("\n"))
+        name = "Main" if self.language == "java" else "Program"
+        return f"class {name} {{\n" + "\n".join(indent(function) for function in body) + "}\n"
+
+    def function(self, n):
+        names = [f"v{i}" for i in range(max(self.identifiers, 1))]
+        modifier = "" if self.language == "c" else "static "
+        lines = [f"{modifier}int f{n}(int a, int b)", "{"]
+        for i, name in enumerate(names):
+            lines.append(f"    int {name} = {i + 1};")
+        for _ in range(self.statements):
+            lines.extend(self.statement(names, 1, self.depth))
+        if n > 0:
+            # A nested call of the earlier functions, for the 20.x styles
+            callee = self.random.randrange(n)
+            lines.append(f"    {self.random.choice(names)} = f{callee}(f{callee}(a, b), {names[0]});")
+        lines.append(f"    return {' + '.join(names[:3])};")
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def statement(self, names, level, depth):
+        # Lines of a statement at nesting level, which may nest depth more levels
+        pad = "    " * level
+        x, y = self.random.choice(names), self.random.choice(names)
+        if depth > 0 and self.random.random() < self.density:
+            kind = self.random.choice(["if", "for", "while", "switch"])
+            body = []
+            for _ in range(max(1, self.statements // 2)):
+                body.extend(self.statement(names, level + 1, depth - 1))
+            if kind == "if":
+                lines = [f"{pad}if ({x} > {y}) {{"] + body
+                if self.random.random() < 0.5:
+                    lines += [f"{pad}}} else {{", f"{pad}    {x} = {y} - 1;"]
+                return lines + [f"{pad}}}"]
+            if kind == "for":
+                i = f"i{level}"
+                return [f"{pad}for (int {i} = 0; {i} < {x}; {i}++) {{"] + body + [f"{pad}}}"]
+            if kind == "while":
+                return [f"{pad}while ({x} < {y}) {{", f"{pad}    {x}++;"] + body + [f"{pad}}}"]
+            lines = [f"{pad}switch ({x} % 3) {{"]
+            for case in range(2):
+                lines.append(f"{pad}case {case}:")
+                lines.extend(body)
+                lines.append(f"{pad}    break;")
+            return lines + [f"{pad}default:", f"{pad}    {y} = 0;", f"{pad}    break;", f"{pad}}}"]
+        kind = self.random.choice(["assign", "augmented", "ternary", "increment", "condition"])
+        if kind == "assign":
+            return [f"{pad}{x} = {y} * 2 + a;"]
+        if kind == "augmented":
+            return [f"{pad}{x} = {x} + {y};"]
+        if kind == "ternary":
+            return [f"{pad}{x} = {y} > b ? {y} : b;"]
+        if kind == "increment":
+            return [f"{pad}{x}++;"]
+        return [f"{pad}if (!({x} == {y})) {x} = a;"]
+
+
+def generate_program(language="c", **kwargs):
+    return ProgramGenerator(language, **kwargs).generate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic program for scaling benchmarks.")
+    parser.add_argument("--lang", type=str, default="c", choices=["c", "java", "c_sharp"],
+                        help="Language of the program (default: c)")
+    parser.add_argument("--functions", type=int, default=10, help="Number of functions (default: 10)")
+    parser.add_argument("--depth", type=int, default=2, help="Maximum nesting depth of statements (default: 2)")
+    parser.add_argument("--density", type=float, default=0.5,
+                        help="Probability that a statement is a loop/if/switch (default: 0.5)")
+    parser.add_argument("--identifiers", type=int, default=8, help="Local variables per function (default: 8)")
+    parser.add_argument("--statements", type=int, default=4,
+                        help="Statements per function body, half as many per nested block (default: 4)")
+    parser.add_argument("--bytes", type=int,
+                        help="Add functions until the program is this large, instead of --functions")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--output", type=str, help="File to write the program to (default: stdout)")
+    args = parser.parse_args()
+
+    program = generate_program(args.lang, functions=args.functions, depth=args.depth, density=args.density,
+                               identifiers=args.identifiers, statements=args.statements,
+                               target_bytes=args.bytes, seed=args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(program)
+    else:
+        sys.stdout.write(program)
@@ -0,0 +1,194 @@
+import os
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+import logging
+
+from pipeline import TransformPipeline, detect_fields
+
+class CodeTransformerGUI:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Code Transformer")
+        self.root.geometry("800x600")
+        self.language = "c"
+        self.dataset_file = ""
+        self.transformations = []
+        self.output_path = ""
+        self.code_field = "func"
+        self.fields = []
+        self.selected_fields = []
+        self.verbose_logging = False
+        self.output_format = "jsonl"  # Default output format
+        self.supported_styles = TransformPipeline.supported_styles
+
+        # Setup logging
+        logging.basicConfig(
+            filename="transform.log",
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s - %(message)s"
+        )
+        self.logger = logging.getLogger()
+
+        # GUI Layout
+        self._setup_gui()
+
+    def _setup_gui(self):
+        main_frame = ttk.Frame(self.root, padding="10")
+        main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        # Language Selection
+        ttk.Label(main_frame, text="Language:", font=("Arial", 12)).grid(row=0, column=0, sticky="w", pady=5)
+        self.language_var = tk.StringVar(value=self.language)
+        languages = ["c", "java", "python", "c_sharp"]
+        ttk.OptionMenu(main_frame, self.language_var, self.language, *languages, command=self._update_language).grid(row=0, column=1, sticky="w", pady=5)
+
+        # Dataset File Selection
+        ttk.Label(main_frame, text="Dataset File:", font=("Arial", 12)).grid(row=1, column=0, sticky="w", pady=5)
+        self.file_entry = ttk.Entry(main_frame, width=50)
+        self.file_entry.grid(row=1, column=1, pady=5)
+        ttk.Button(main_frame, text="Browse", command=self._browse_dataset).grid(row=1, column=2, padx=5, pady=5)
+
+        # Code Field Selection
+        ttk.Label(main_frame, text="Code Field:", font=("Arial", 12)).grid(row=2, column=0, sticky="w", pady=5)
+        self.code_field_entry = ttk.Entry(main_frame, width=20)
+        self.code_field_entry.insert(0, self.code_field)
+        self.code_field_entry.grid(row=2, column=1, sticky="w", pady=5)
+
+        # Fields Selection
+        ttk.Label(main_frame, text="Select Fields:", font=("Arial", 12)).grid(row=3, column=0, sticky="w", pady=5)
+        self.fields_frame = ttk.Frame(main_frame)
+        self.fields_frame.grid(row=3, column=1, sticky="w", pady=5)
+        self.field_vars = {}
+
+        # Transformations
+        ttk.Label(main_frame, text="Transformations:", font=("Arial", 12)).grid(row=4, column=0, sticky="w", pady=5)
+        self.transform_listbox = tk.Listbox(main_frame, height=8, width=50)
+        self.transform_listbox.grid(row=4, column=1, pady=5)
+
+        # Transformation Controls
+        trans_frame = ttk.Frame(main_frame)
+        trans_frame.grid(row=5, column=1, pady=5)
+        ttk.Label(trans_frame, text="Add Style:").pack(side=tk.LEFT)
+        self.style_var = tk.StringVar()
+        ttk.OptionMenu(trans_frame, self.style_var, self.supported_styles[0], *self.supported_styles).pack(side=tk.LEFT, padx=5)
+        ttk.Button(trans_frame, text="Add", command=self._add_transformation).pack(side=tk.LEFT, padx=5)
+        ttk.Button(trans_frame, text="Delete", command=self._delete_transformation).pack(side=tk.LEFT, padx=5)
+
+        # Output Path
+        ttk.Label(main_frame, text="Output Path:", font=("Arial", 12)).grid(row=6, column=0, sticky="w", pady=5)
+        self.output_entry = ttk.Entry(main_frame, width=50)
+        self.output_entry.grid(row=6, column=1, pady=5)
+        ttk.Button(main_frame, text="Browse", command=self._browse_output).grid(row=6, column=2, padx=5, pady=5)
+
+        # Output Format
+        ttk.Label(main_frame, text="Output Format:", font=("Arial", 12)).grid(row=7, column=0, sticky="w", pady=5)
+        self.format_var = tk.StringVar(value=self.output_format)
+        formats = ["jsonl", "csv", "parquet", "dataset"]
+        ttk.OptionMenu(main_frame, self.format_var, self.output_format, *formats).grid(row=7, column=1, sticky="w", pady=5)
+
+        # Verbose Logging
+        self.verbose_var = tk.BooleanVar(value=self.verbose_logging)
+        ttk.Checkbutton(main_frame, text="Verbose Logging", variable=self.verbose_var, command=self._toggle_verbose).grid(row=8, column=1, sticky="w", pady=5)
+
+        # Run Button
+        ttk.Button(main_frame, text="Run Transformation", command=self._run_transformation).grid(row=9, column=1, pady=20)
+
+    def _update_language(self, value):
+        self.language = value
+
+    def _toggle_verbose(self):
+        self.verbose_logging = self.verbose_var.get()
+        self.logger.setLevel(logging.DEBUG if self.verbose_logging else logging.INFO)
+
+    def _browse_dataset(self):
+        self.dataset_file = filedialog.askopenfilename(title="Select JSONL File", filetypes=[("JSONL Files", "*.jsonl")])
+        if self.dataset_file:
+            self.file_entry.delete(0, tk.END)
+            self.file_entry.insert(0, self.dataset_file)
+            base_name = os.path.basename(self.dataset_file)
+            name, ext = os.path.splitext(base_name)
+            default_output = os.path.join("dataset", "processed_data", f"{name}_processed{ext}")
+            self.output_entry.delete(0, tk.END)
+            self.output_entry.insert(0, default_output)
+            self._detect_fields()
+
+    def _detect_fields(self):
+        self.fields = []
+        try:
+            self.fields = detect_fields(self.dataset_file)
+            self.selected_fields = self.fields.copy()
+        except Exception as e:
+            messagebox.showwarning("Warning", f"Could not detect fields: {str(e)}")
+            return
+
+        for widget in self.fields_frame.winfo_children():
+            widget.destroy()
+        self.field_vars.clear()
+
+        for field in self.fields:
+            var = tk.BooleanVar(value=True)
+            self.field_vars[field] = var
+            ttk.Checkbutton(self.fields_frame, text=field, variable=var).pack(anchor="w")
+
+    def _browse_output(self):
+        output_file = filedialog.asksaveasfilename(
+            title="Select Output File",
+            defaultextension=f".{self.format_var.get()}",
+            filetypes=[(f"{self.format_var.get().upper()} Files", f"*.{self.format_var.get()}")]
+        )
+        if output_file:
+            self.output_entry.delete(0, tk.END)
+            self.output_entry.insert(0, output_file)
+            self.output_path = output_file
+
+    def _add_transformation(self):
+        style = self.style_var.get()
+        if style:
+            self.transformations.append(style)
+            self.transform_listbox.insert(tk.END, style)
+            self.style_var.set(self.supported_styles[0])  # Reset dropdown
+        else:
+            messagebox.showwarning("Input Error", "Please select a transformation style.")
+
+    def _delete_transformation(self):
+        selection = self.transform_listbox.curselection()
+        if selection:
+            idx = selection[0]
+            self.transform_listbox.delete(idx)
+            self.transformations.pop(idx)
+        else:
+            messagebox.showwarning("Selection Error", "Please select a transformation to delete.")
+
+    def _run_transformation(self):
+        if not self.dataset_file:
+            messagebox.showerror("Error", "Please select a dataset file.")
+            return
+        if not self.transformations:
+            messagebox.showerror("Error", "Please add at least one transformation.")
+            return
+        if not self.output_entry.get():
+            messagebox.showerror("Error", "Please specify an output path.")
+            return
+
+        try:
+            self.output_path = self.output_entry.get()
+            self.code_field = self.code_field_entry.get().strip() or "func"
+            self.output_format = self.format_var.get()
+            self.selected_fields = [field for field, var in self.field_vars.items() if var.get()]
+            if not self.selected_fields:
+                messagebox.showerror("Error", "Please select at least one field.")
+                return
+            if self.code_field not in self.selected_fields:
+                self.selected_fields.append(self.code_field)
+            pipeline = TransformPipeline(self.language, self.code_field, self.selected_fields,
+                                         self.output_format, self.verbose_logging)
+            pipeline.run(self.dataset_file, self.transformations, self.output_path)
+            messagebox.showinfo("Success", "Transformation completed successfully!")
+        except Exception as e:
+            messagebox.showerror("Error", f"Transformation failed: {str(e)}")
+            self.logger.error(f"Transformation failed: {str(e)}")
+
+def run_gui():
+    root = tk.Tk()
+    app = CodeTransformerGUI(root)
+    root.mainloop()
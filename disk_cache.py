@@ -0,0 +1,90 @@
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+from typing import Iterable
+
+
+def source_fingerprint(paths: Iterable[str]) -> str:
+    # Hash of the contents of the files a result depends on, so results of an
+    # older version of them are never returned
+    h = hashlib.blake2b(digest_size=16)
+    for path in sorted(paths):
+        h.update(os.path.basename(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class DiskCache:
+    # Pickled values in a SQLite database in cache_dir, shared by the processes
+    # (and runs) using the same directory. When the entries grow past max_bytes,
+    # the least recently used ones are dropped down to 90% of it.
+    db_name = "transform_cache.sqlite"
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1 << 30):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, self.db_name)
+        self.max_bytes = max_bytes
+        # Autocommit, every put is durable on its own, so a killed run keeps
+        # what it cached
+        self.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key BLOB PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self.total = self.size()
+
+    def size(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key: bytes):
+        # The value stored under key, or None
+        row = self.conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        return pickle.loads(row[0])
+
+    def put(self, key: bytes, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        size = len(key) + len(blob)
+        if size > self.max_bytes:
+            return
+        # A value replaced under the same key no longer counts
+        row = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+            (key, blob, size, time.time()),
+        )
+        self.total += size - (row[0] if row else 0)
+        if self.total > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        # Other processes write to the same database, so the size is recounted
+        self.total = self.size()
+        excess = self.total - int(self.max_bytes * 0.9)
+        if self.total <= self.max_bytes or excess <= 0:
+            return
+        keys = []
+        for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self.conn.executemany("DELETE FROM entries WHERE key = ?", keys)
+        self.total = self.size()
+
+    def clear(self):
+        self.conn.execute("DELETE FROM entries")
+        self.total = 0
+
+    def close(self):
+        self.conn.close()
@@ -1,5 +1,7 @@
 import re
 from tree_sitter import Parser, Language
+from bisect import bisect_left, bisect_right, insort
+from collections import deque, OrderedDict
 import inspect
 
 cpp_keywords = [
@@ -34,35 +36,305 @@ def get_parameter_count(func):
     params = signature.parameters
     return len(params)
 
+class EditConflict(ValueError):
+    # Raised when an operation overlaps an edit that was already accepted, or
+    # falls outside the blob
+    pass
+
+def get_edit(op, size):
+    # Turn an operation into the (start, end, text) edit of the original blob it
+    # stands for: (pos, str) inserts str at pos, (pos, -n) deletes the n elements
+    # left of pos, and (pos, k) deletes the elements between k and pos
+    pos, arg = op
+    if type(arg) is int:
+        if arg < 0:
+            start, end = pos + arg, pos
+        else:
+            start, end = min(pos, arg), max(pos, arg)
+        text = None
+    else:
+        start, end, text = pos, pos, arg
+    if start < 0 or end > size:
+        raise EditConflict(f"operation {op} is out of the range of the blob")
+    return start, end, text
+
+class EditBuffer:
+    # Piece table over blob, a str or a bytes-like object (bytes, bytearray,
+    # memoryview) indexed by the byte offsets of the nodes. Operations are
+    # recorded as edits of the original blob, checked against the edits accepted
+    # so far, and the new blob is built from the unchanged pieces and the
+    # inserted strings in one pass.
+    def __init__(self, blob):
+        self.blob = blob
+        self.edits = []         # accepted edits, in the order they were added
+        self.del_starts = []    # sorted starts of the accepted deletions
+        self.del_ends = []      # ends of the accepted deletions, in the same order
+        self.inserts = []       # sorted positions of the accepted insertions
+        self.conflicts = []     # operation lists rejected by try_extend
+        self.operations = []    # operations of the accepted edits
+
+    def overlaps(self, start, end):
+        # Whether the edit [start, end) overlaps an accepted edit. Deletions may
+        # touch each other, insertions may sit at either end of a deletion.
+        i = bisect_left(self.del_starts, end if end > start else start) - 1
+        if i >= 0 and self.del_ends[i] > start:
+            return True
+        if end > start:
+            i = bisect_right(self.inserts, start)
+            if i < len(self.inserts) and self.inserts[i] < end:
+                return True
+        return False
+
+    def add(self, start, end, text):
+        if text is None:
+            i = bisect_left(self.del_starts, start)
+            self.del_starts.insert(i, start)
+            self.del_ends.insert(i, end)
+        else:
+            insort(self.inserts, start)
+        self.edits.append((start, end, text))
+
+    def extend(self, operation):
+        # Add all the operations of one conversion, or none of them if any of
+        # them overlaps an accepted edit or another one of them
+        edits = [get_edit(op, len(self.blob)) for op in operation]
+        edits = [e for e in edits if e[1] > e[0] or e[2]]
+        added = len(self.edits)
+        for start, end, text in edits:
+            if self.overlaps(start, end):
+                for edit in self.edits[added:]:
+                    self.remove(*edit)
+                del self.edits[added:]
+                raise EditConflict(f"operation {operation} overlaps an earlier edit")
+            self.add(start, end, text)
+        self.operations.extend(operation)
+
+    def try_extend(self, operation):
+        # extend() that records the rejected operation instead of raising
+        try:
+            self.extend(operation)
+            return True
+        except EditConflict:
+            self.conflicts.append(operation)
+            return False
+
+    def remove(self, start, end, text):
+        if text is None:
+            i = bisect_left(self.del_starts, start)
+            del self.del_starts[i], self.del_ends[i]
+        else:
+            del self.inserts[bisect_left(self.inserts, start)]
+
+    def changed(self):
+        # Whether the accepted edits change the blob other than in whitespace.
+        # Only the edited regions are compared, edits separated by whitespace
+        # alone being one region, so identity edits (a node rewritten to the
+        # same text) and whitespace-only edits do not count.
+        is_str = isinstance(self.blob, str)
+        join = ('' if is_str else b'').join
+        region = None   # [start, end, new pieces] of the region being compared
+        for start, end, text in self.sorted_edits():
+            if region is not None and strip_whitespace(self.blob[region[1]:start]):
+                if strip_whitespace(self.blob[region[0]:region[1]]) != strip_whitespace(join(region[2])):
+                    return True
+                region = None
+            if region is None:
+                region = [start, start, []]
+            region[2].append(self.blob[region[1]:start])
+            if text is None:
+                region[1] = end
+            else:
+                region[2].append(text if is_str or not isinstance(text, str) else text.encode('utf-8'))
+                region[1] = start
+        if region is not None:
+            return strip_whitespace(self.blob[region[0]:region[1]]) != strip_whitespace(join(region[2]))
+        return False
+
+    def sorted_edits(self):
+        # The edits in the order text() applies them. Insertions at the same
+        # position go longest first.
+        return sorted(self.edits, key=lambda e: (e[0], 1 if e[2] is None else 0, -len(e[2]) if e[2] is not None else 0))
+
+    def text(self):
+        # Build the edited blob
+        edits = self.sorted_edits()
+        is_str = isinstance(self.blob, str)
+        pieces = []
+        last = 0
+        for start, end, text in edits:
+            pieces.append(self.blob[last:start])
+            if text is None:
+                last = end
+            else:
+                # Inserted strings go into a bytes-like blob as utf-8
+                pieces.append(text if is_str or not isinstance(text, str) else text.encode('utf-8'))
+                last = start
+        pieces.append(self.blob[last:])
+        return ('' if is_str else b'').join(pieces)
+
 def replace_from_blob(operation, blob):
-    diff = 0        # The length difference caused by the insertion deletion
-    # Sort the first element and the modified position from smallest to largest, if there is the same location to delete and insert, delete first and then insert
-    operation = sorted(operation, key=lambda x: (x[0], 1 if type(x[1]) is int else 0, -len(x[1]) if type(x[1]) is not int else 0)) # The first key is index, the second key is deleted first, and the third key is inserted first with fewer strings
+    # Apply the operations to blob, raising EditConflict if they overlap
+    buffer = EditBuffer(blob)
+    buffer.extend(operation)
+    return buffer.text()
+
+def get_operation_range(operation):
+    # Return the [start, end) span of the original blob touched by the operations
+    start, end = None, None
     for op in operation:
-        if type(op[1]) is int:  # If the second element is a number
-            if op[1] < 0:      # If it is less than 0, the elements are removed from op[0] to the left to op[1].
-                del_num = op[1]
-            else:       # then remove the elements from op[0] to the left to op[1].
-                del_num = op[1] - op[0]
-            blob = blob[:op[0] + diff + del_num] + blob[op[0] + diff:]
-            diff += del_num
-        else:                   # If the second element is a string, insert the string from op[0] to the right, diff+=len(op[1])
-            blob = blob[:op[0] + diff] + op[1] + blob[op[0] + diff:]
-            diff += len(op[1])
-    return blob
+        if type(op[1]) is int:
+            if op[1] < 0:
+                lo, hi = op[0] + op[1], op[0]
+            else:
+                lo, hi = min(op[0], op[1]), max(op[0], op[1])
+        else:
+            lo, hi = op[0], op[0]
+        start = lo if start is None else min(start, lo)
+        end = hi if end is None else max(end, hi)
+    return start, end
+
+def strip_whitespace(blob):
+    # blob (str or bytes) without the spaces, newlines and tabs
+    if isinstance(blob, str):
+        return blob.translate(whitespace_table)
+    return bytes(blob).translate(None, b' \n\t')
+
+whitespace_table = {ord(c): None for c in ' \n\t'}
+
+def get_point(blob, pos):
+    # Convert an offset of blob into the (row, column) point used by tree-sitter
+    newline = '\n' if isinstance(blob, str) else b'\n'
+    row = blob.count(newline, 0, pos)
+    column = pos - (blob.rfind(newline, 0, pos) + 1)
+    return (row, column)
+
+def byte_view(blob):
+    # str with one character per byte of the utf-8 bytes blob, for converters that
+    # index the code with the byte offsets of nodes (get_indent)
+    return blob.decode('latin-1')
 
 def traverse_rec_func(node, results, func, code=None):
     # Traverse the entire AST tree and return a list of func-compliant node results
-    if get_parameter_count(func) == 1:
-        if func(node):
-            results.append(node)
-    else:
-        if func(node, code):
-            results.append(node)
-    if not node.children:
-        return
-    for n in node.children:
-        traverse_rec_func(n, results, func)
+    with_code = get_parameter_count(func) != 1
+    for n in find_nodes(node):
+        if func(n, code) if with_code else func(n):
+            results.append(n)
+
+class NodeIndex:
+    # Preorder list of the nodes under root, built with a single TreeCursor walk,
+    # and the positions of the nodes of each type, so that matchers and counters
+    # look up their candidate nodes instead of each walking the tree again
+    def __init__(self, root):
+        self.root = root
+        self.nodes = []     # nodes in preorder
+        self.ends = []      # position after the last descendant of each node
+        self.types = {}     # node type -> positions of the nodes of that type
+        self.ids = {}       # node id -> position
+        cursor = root.walk()
+        stack = []
+        while True:
+            node = cursor.node
+            pos = len(self.nodes)
+            self.nodes.append(node)
+            self.ends.append(pos + 1)
+            self.types.setdefault(node.type, []).append(pos)
+            self.ids[node.id] = pos
+            stack.append(pos)
+            if cursor.goto_first_child():
+                continue
+            while True:
+                self.ends[stack.pop()] = len(self.nodes)
+                if cursor.goto_next_sibling():
+                    break
+                if not cursor.goto_parent():
+                    return
+
+    def find(self, root, types=None):
+        # Nodes of the given types in the subtree of root (all nodes if types is None), in preorder
+        pos = self.ids.get(root.id)
+        if pos is None or self.nodes[pos] != root:
+            return None
+        end = self.ends[pos]
+        if types is None:
+            return self.nodes[pos:end]
+        if isinstance(types, str):
+            types = [types]
+        positions = []
+        for type in types:
+            type_positions = self.types.get(type)
+            if type_positions:
+                positions.extend(type_positions[bisect_left(type_positions, pos):bisect_left(type_positions, end)])
+        if len(types) > 1:
+            positions.sort()
+        return [self.nodes[i] for i in positions]
+
+node_indexes = deque(maxlen=8)
+type_log = None     # list of the types looked up with find_nodes while it is set, see log_types
+
+def log_types(types):
+    # Record the node types a matcher asks for, so that IST.fuse_style knows
+    # which nodes the matcher looked at
+    if type_log is not None:
+        type_log.append(types)
+
+def find_nodes(root, types=None):
+    # Return the nodes of the given types in the subtree of root in preorder, the
+    # same nodes and order as a recursive walk over node.children. The tree under
+    # root is indexed on first use and the index is shared by later lookups.
+    log_types(types)
+    for index in reversed(node_indexes):
+        nodes = index.find(root, types)
+        if nodes is not None:
+            return nodes
+    index = NodeIndex(root)
+    node_indexes.append(index)
+    return index.find(root, types)
+
+def root_of(node):
+    while node.parent is not None:
+        node = node.parent
+    return node
+
+class TreeCache:
+    # Values that a matcher computes for a tree and its converter reads back,
+    # kept for the maxsize most recently used trees. A value may hold nodes,
+    # and with them their whole tree, until it is evicted.
+    def __init__(self, name, maxsize=8):
+        self.entries = OrderedDict()    # root id -> (root, value)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        tree_caches[name] = self
+
+    def get(self, node, default=None):
+        # Value of the tree of node
+        root = root_of(node)
+        entry = self.entries.get(root.id)
+        if entry is None or entry[0] != root:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(root.id)
+        return entry[1]
+
+    def set(self, node, value):
+        root = root_of(node)
+        self.entries[root.id] = (root, value)
+        self.entries.move_to_end(root.id)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {"size": len(self.entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+tree_caches = {}    # name -> TreeCache
+
+def cache_stats():
+    # Size and hit statistics of the TreeCaches of the transformations
+    return {name: cache.stats() for name, cache in tree_caches.items()}
 
 def tokenize_help(node, tokens):
     # Traverse the entire AST tree and return a list of func-compliant node results
@@ -0,0 +1,762 @@
+import os
+import json
+import mmap
+import time
+import heapq
+import signal
+import logging
+import threading
+from array import array
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+from multiprocessing import Pool
+
+from transfer import IST
+from ist_utils import cache_stats
+from profiling import merge_stats
+from writers import output_writers, merge_parts
+
+
+def detect_fields(dataset_file: str) -> List[str]:
+    # Field names of the first record of a jsonl dataset
+    with open(dataset_file, "r", encoding="utf-8") as f:
+        first_line = f.readline().strip()
+    return list(json.loads(first_line).keys()) if first_line else []
+
+
+def default_output_path(dataset_file: str, output_format: str) -> str:
+    name, _ = os.path.splitext(os.path.basename(dataset_file))
+    ext = {"jsonl": ".jsonl", "csv": ".csv", "parquet": ".parquet"}.get(output_format, "")
+    return os.path.join("dataset", "processed_data", f"{name}_processed{ext}")
+
+
+def load_line_index(dataset_file: str) -> array:
+    # Byte offsets of the starts of the lines of dataset_file, followed by its
+    # size. The index is cached in dataset_file + ".idx", behind the size and
+    # mtime of the file it was built for, and rebuilt when the file changed.
+    st = os.stat(dataset_file)
+    key = array("Q", [st.st_size, st.st_mtime_ns])
+    idx_path = dataset_file + ".idx"
+    index = array("Q")
+    try:
+        with open(idx_path, "rb") as f:
+            index.frombytes(f.read())
+        if index[:2] == key:
+            return index[2:]
+    except (OSError, ValueError):
+        pass
+
+    index = array("Q")
+    if st.st_size > 0:
+        with open(dataset_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = 0
+            while pos < st.st_size:
+                index.append(pos)
+                newline = mm.find(b"\n", pos)
+                pos = st.st_size if newline < 0 else newline + 1
+    index.append(st.st_size)
+    try:
+        tmp_path = idx_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write((key + index).tobytes())
+        os.replace(tmp_path, idx_path)
+    except OSError:
+        # The index is only a cache, e.g. the input may be on a read-only mount
+        pass
+    return index
+
+
+def shard_range(dataset_file: str, shard: int, num_shards: int) -> Tuple[int, int]:
+    # Byte range of the lines of the shard-th of num_shards contiguous slices of dataset_file
+    if not 0 <= shard < num_shards:
+        raise ValueError(f"Shard {shard} is not in 0..{num_shards - 1}.")
+    index = load_line_index(dataset_file)
+    lines = len(index) - 1
+    return index[shard * lines // num_shards], index[(shard + 1) * lines // num_shards]
+
+
+def shard_path(output_path: str, shard: int, num_shards: int) -> str:
+    name, ext = os.path.splitext(output_path)
+    return f"{name}.part-{shard}-of-{num_shards}{ext}"
+
+
+def rejects_path(output_path: str) -> str:
+    return output_path + ".rejects.jsonl"
+
+
+class SampleTimeout(Exception):
+    pass
+
+
+timeout_interval = 0.1
+
+
+def _raise_timeout(signum, frame):
+    raise SampleTimeout()
+
+
+@contextmanager
+def time_budget(seconds: Optional[float]):
+    # Raise SampleTimeout in the block once it ran for seconds. The timer is
+    # SIGALRM, so there is no budget off the main thread or on platforms
+    # without it (Windows). It keeps firing every timeout_interval seconds,
+    # as some transforms swallow the exception in a bare except.
+    if not seconds or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds, timeout_interval)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def merge_timings(timings: Dict[str, Dict[str, list]], other: Dict[str, Dict[str, list]]):
+    # Add the IST.timings other to timings
+    for style, stages in other.items():
+        for stage, (calls, seconds) in stages.items():
+            entry = timings.setdefault(style, {}).setdefault(stage, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+
+
+# Counters of an IST reported in the summary of a run
+ist_counters = ["parse_count", "cache_hits", "cache_misses", "disk_cache_hits", "disk_cache_misses"]
+
+
+def counter_delta(after: Dict[str, int], before: Dict[str, int]) -> Dict[str, int]:
+    return {name: after.get(name, 0) - before.get(name, 0) for name in ist_counters}
+
+
+class TransformPipeline:
+    # Read a jsonl dataset, apply a chain of IST styles to the code field of
+    # every record and write the result. Used by the command line and the GUI
+    # of BatchSample_Generator, without importing either. pyarrow and datasets
+    # are only imported when the parquet or dataset output format is written.
+    supported_styles = [
+        "-3.1", "-2.1", "-2.2", "-2.3", "-2.4",
+        "-1.1", "-1.2", "-1.3",
+        "0.0", "0.1", "0.2", "0.3", "0.4", "0.5", "0.6",
+        "1.1", "1.2", "2.1", "2.2",
+        "3.1", "3.2", "3.3", "3.4",
+        "4.1", "4.2", "4.3", "4.4",
+        "5.1", "5.2", "6.1", "6.2",
+        "7.1", "7.2", "8.1", "8.2",
+        "9.1", "9.2", "10.0", "10.1", "10.2", "10.3", "10.4", "10.5", "10.6", "10.7",
+        "11.1", "11.2", "11.3", "11.4",
+        "12.1", "12.2", "12.3", "12.4",
+        "13.1", "13.2",
+        "14.1", "14.2",
+        "15.1", "15.2",
+        "16.1", "16.2",
+        "17.1", "17.2",
+        "18.1", "18.2",
+        "19.1", "19.2",
+        "20.1", "20.2",
+        "21.1", "21.2"
+    ]
+
+    def __init__(self, language: str = "c", code_field: str = "func", selected_fields: Optional[List[str]] = None,
+                 output_format: str = "jsonl", verbose_logging: bool = False, cache_size: int = 4096,
+                 cache_dir: Optional[str] = None, cache_max_mb: int = 1024, sample_budget: Optional[float] = None,
+                 timings: bool = False):
+        self.language = language
+        self.code_field = code_field
+        self.selected_fields = list(selected_fields or [])
+        self.output_format = output_format
+        self.verbose_logging = verbose_logging
+        self.dataset_file = ""
+        self.output_path = ""
+        self.cache_size = cache_size
+        self.cache_dir = cache_dir
+        self.cache_max_mb = cache_max_mb
+        self.worker_counters = {}   # ist_counters summed over the workers of transform_parallel
+        # Seconds a record may take through its styles, past which it is left
+        # unchanged and added to rejects, see guarded()
+        self.sample_budget = sample_budget
+        if sample_budget and not hasattr(signal, "setitimer"):
+            print("Warning: on this platform, samples over the time budget are only rejected once they finish.")
+        self.rejects = []           # rejected records not written to the rejects file yet
+        self.slowest = []           # [seconds, idx, styles] of the slowest records, see note_time()
+        # Repeated snippets (duplicates within and across dataset splits) are
+        # only transformed once, see IST.cached. With a cache_dir, so are the
+        # snippets transformed by earlier runs.
+        self.ist = IST(language, cache_size=cache_size, cache_dir=cache_dir, cache_max_bytes=cache_max_mb << 20)
+        # Per-stage timings of the transfers, see IST.timed and timing_report
+        if timings:
+            self.ist.timings = {}
+        self.worker_timings = {}    # IST.timings summed over the workers of transform_parallel
+
+        logging.basicConfig(
+            filename="transform.log",
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s - %(message)s"
+        )
+        self.logger = logging.getLogger()
+        self.logger.setLevel(logging.DEBUG if verbose_logging else logging.INFO)
+
+    def run(self, dataset_file: str, transformations: List[str], output_path: str, in_memory: bool = False,
+            order: str = "style", workers: int = 1, chunk_size: int = 64, resume: bool = False,
+            checkpoint_every: int = 1000, shard: Optional[Tuple[int, int]] = None,
+            max_tasks_per_worker: Optional[int] = None, profile_dir: Optional[str] = None):
+        # Transform dataset_file into output_path. The records are streamed from
+        # the input to the writer of the output format, with checkpoints to
+        # resume from, unless in_memory is set. shard (i, n) only transforms the i-th of n contiguous slices of the
+        # input lines into a part file of output_path, see merge_shards. With a
+        # profile_dir, the transfers of each style are profiled into it, see IST.profile.
+        self.dataset_file = dataset_file
+        self.output_path = output_path
+        if not self.selected_fields:
+            self.selected_fields = detect_fields(dataset_file)
+        if self.code_field not in self.selected_fields:
+            self.selected_fields.append(self.code_field)
+        if shard is not None and in_memory:
+            raise ValueError("Sharding needs the streamed transform, not in_memory.")
+
+        with self.ist.profile(profile_dir) if profile_dir else nullcontext():
+            if not in_memory:
+                self.run_stream(dataset_file, transformations, self.code_field, output_path,
+                                workers=workers, chunk_size=chunk_size, resume=resume,
+                                checkpoint_every=checkpoint_every, shard=shard,
+                                max_tasks_per_worker=max_tasks_per_worker)
+            else:
+                if os.path.exists(rejects_path(output_path)):
+                    os.remove(rejects_path(output_path))
+                code_snippets = self.load_dataset(dataset_file, self.code_field)
+                transformed_snippets = self.transform_dataset(code_snippets, transformations, self.code_field, order)
+                self.save(transformed_snippets, output_path, self.output_format)
+        if profile_dir:
+            print(f"Profiles saved to: {profile_dir}")
+
+    def load_dataset(self, dataset_file: str, code_field: str) -> List[dict]:
+        if not os.path.exists(dataset_file):
+            raise FileNotFoundError(f"Dataset file '{dataset_file}' does not exist.")
+
+        code_snippets = []
+        with open(dataset_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    data = json.loads(line.strip())
+                    if code_field in data and data[code_field].strip():
+                        code_snippets.append(data)
+                except json.JSONDecodeError:
+                    self.logger.warning(f"Skipping invalid JSONL line in {dataset_file}")
+        self.logger.info(f"Loaded {len(code_snippets)} functions from '{dataset_file}'.")
+        print(f"Loaded {len(code_snippets)} functions.")
+        return code_snippets
+
+    def iter_dataset(self, dataset_file: str, code_field: str, start: int = 0,
+                     end: Optional[int] = None) -> Iterator[dict]:
+        # Same records as load_dataset, read one line at a time from the byte range [start, end)
+        for _, data in self.iter_dataset_offsets(dataset_file, code_field, start, end):
+            yield data
+
+    def iter_dataset_offsets(self, dataset_file: str, code_field: str, start: int = 0,
+                             end: Optional[int] = None) -> Iterator[tuple]:
+        # (end, record) of the records of iter_dataset, where end is the byte
+        # offset of the input just after the record's line. The input is
+        # memory-mapped, lines are sliced out of the map as they are parsed.
+        if not os.path.exists(dataset_file):
+            raise FileNotFoundError(f"Dataset file '{dataset_file}' does not exist.")
+        loaded = 0
+        if os.path.getsize(dataset_file) > 0:
+            with open(dataset_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                end = len(mm) if end is None else end
+                pos = start
+                while pos < end:
+                    newline = mm.find(b"\n", pos, end)
+                    line, pos = mm[pos:end if newline < 0 else newline + 1], end if newline < 0 else newline + 1
+                    try:
+                        data = json.loads(line.decode("utf-8").strip())
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        self.logger.warning(f"Skipping invalid JSONL line in {dataset_file}")
+                        continue
+                    if code_field in data and data[code_field].strip():
+                        loaded += 1
+                        yield pos, data
+        self.logger.info(f"Loaded {loaded} functions from '{dataset_file}'.")
+        print(f"Loaded {loaded} functions.")
+
+    def transform_dataset(self, code_snippets: List[dict], transformations: List[str], code_field: str,
+                          order: str = "style") -> List[dict]:
+        # order "style" applies each style to the whole dataset before the next
+        # one, "sample" takes each record once through the whole chain
+        transformed_snippets = code_snippets.copy()
+        conversions_per_style = {style: 0 for style in transformations}
+        counters = self.counters()
+
+        if order == "sample":
+            transformed_snippets = [
+                self.transform_record(item, transformations, code_field, conversions_per_style)
+                for item in transformed_snippets
+            ]
+        else:
+            for style in transformations:
+                current_snippets = []
+                converted_count = 0
+
+                for item in transformed_snippets:
+                    new_item, converted = self.transform_item(item, style, code_field)
+                    current_snippets.append(new_item)
+                    converted_count += converted
+
+                transformed_snippets = current_snippets
+                conversions_per_style[style] = converted_count
+
+        counters = counter_delta(self.counters(), counters)
+
+        final_snippets = [self.select_fields(item) for item in transformed_snippets]
+        rejected = len(self.rejects)
+        if self.output_path:
+            self.write_rejects(rejects_path(self.output_path))
+        self.log_summary(len(final_snippets), transformations, conversions_per_style, counters,
+                         rejected, self.slowest_samples())
+        return final_snippets
+
+    def transform_item(self, item: dict, style: str, code_field: str):
+        # Apply style to the code of one record, returning the record to keep
+        # and whether the style was applied
+        result = self.guarded(item, [style], lambda: self.transform_code(item[code_field], style,
+                                                                          item.get('idx', 'N/A')))
+        if result is None or not result[1]:
+            return item, False
+        new_item = item.copy()
+        new_item[code_field] = result[0]
+        return new_item, True
+
+    def transform_record(self, item: dict, transformations: List[str], code_field: str,
+                         conversions_per_style: Dict[str, int]) -> dict:
+        # Take one record through the whole chain, so that each style works on
+        # code whose parse tree the previous style just left in the IST, and
+        # copy the record once at the end if any style was applied. A rejected
+        # record is kept as it is and counts no conversions.
+        converted = {}
+        new_item = self.guarded(item, transformations,
+                                lambda: self.transform_chain(item, transformations, code_field, converted))
+        for style in transformations:
+            conversions_per_style[style] = conversions_per_style.get(style, 0) + converted.get(style, 0)
+        return item if new_item is None else new_item
+
+    def transform_chain(self, item: dict, transformations: List[str], code_field: str,
+                        converted: Dict[str, int]) -> dict:
+        code = item[code_field]
+        applied = False
+        for style in transformations:
+            code, converted[style] = self.transform_code(code, style, item.get('idx', 'N/A'))
+            applied = applied or converted[style]
+        if not applied:
+            return item
+        new_item = item.copy()
+        new_item[code_field] = code
+        return new_item
+
+    def guarded(self, item: dict, styles: List[str], transform):
+        # transform() of item within the sample budget. When it runs out of time
+        # or recursion, item is added to the rejects and None is returned.
+        start = time.perf_counter()
+        reason = None
+        try:
+            with time_budget(self.sample_budget):
+                result = transform()
+        except SampleTimeout:
+            reason = "timeout"
+        except RecursionError:
+            reason = "recursion"
+        seconds = time.perf_counter() - start
+        if reason is None and self.sample_budget and seconds > self.sample_budget:
+            # The timeout was swallowed by the transform and it finished anyway
+            reason = "timeout"
+        idx = item.get('idx', 'N/A')
+        self.note_time([seconds, idx, styles])
+        if reason is None:
+            return result
+        self.logger.warning(f"Function (idx: {idx}): Rejected ({reason} after {seconds:.2f}s) "
+                            f"applying {', '.join(styles)}")
+        self.rejects.append({"idx": idx, "styles": styles, "reason": reason,
+                             "seconds": round(seconds, 3), "record": item})
+        return None
+
+    slowest_count = 10
+
+    def note_time(self, sample: list):
+        # Keep sample, [seconds, idx, styles], if it is among the slowest_count slowest
+        self.slowest.append(sample)
+        if len(self.slowest) >= 4 * self.slowest_count:
+            self.slowest = heapq.nlargest(self.slowest_count, self.slowest, key=lambda s: s[0])
+
+    def slowest_samples(self) -> List[list]:
+        return heapq.nlargest(self.slowest_count, self.slowest, key=lambda s: s[0])
+
+    def write_rejects(self, path: str) -> int:
+        # Append the pending rejects to the rejects file at path, returning its size
+        if self.rejects:
+            with open(path, "ab") as f:
+                for reject in self.rejects:
+                    f.write((json.dumps(reject) + "\n").encode("utf-8"))
+            self.rejects = []
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def transform_code(self, code: str, style: str, idx) -> tuple:
+        # Apply style to code, returning the code to keep and whether the style was applied
+        if not code.strip():
+            return code, False
+        style_count, new_code, success = self.ist.try_transfer(style, code)
+        if style_count > 0:
+            if success:
+                if self.verbose_logging:
+                    self.logger.debug(f"Function (idx: {idx}): Applied {style} successfully")
+                return new_code, True
+            if self.verbose_logging:
+                self.logger.debug(f"Function (idx: {idx}): Failed to apply {style}")
+        elif self.verbose_logging:
+            self.logger.debug(f"Function (idx: {idx}): No {style} found")
+        return code, False
+
+    def select_fields(self, item: dict) -> dict:
+        return {k: item[k] for k in self.selected_fields if k in item}
+
+    def transform_stream(self, records: Iterable[dict], transformations: List[str], code_field: str,
+                         conversions_per_style: Dict[str, int]) -> Iterator[dict]:
+        # Lazy, sample-major version of transform_dataset: a record goes through
+        # the whole chain and is written before the next one is read.
+        # conversions_per_style is filled in while the records are consumed.
+        for style in transformations:
+            conversions_per_style.setdefault(style, 0)
+        for item in records:
+            yield self.select_fields(self.transform_record(item, transformations, code_field,
+                                                           conversions_per_style))
+
+    def transform_parallel(self, records: Iterable[dict], transformations: List[str], code_field: str,
+                           conversions_per_style: Dict[str, int], workers: int,
+                           chunk_size: int = 64, max_tasks_per_worker: Optional[int] = None) -> Iterator[dict]:
+        # transform_stream in a pool of worker processes, each with its own IST.
+        # Chunks of records are handed out in input order, at most two per
+        # worker at a time, and the results are yielded in the same order. A
+        # worker is replaced by a fresh process after max_tasks_per_worker
+        # chunks, which returns whatever memory it built up.
+        initargs = (self.language, code_field, self.selected_fields, self.verbose_logging, self.cache_size,
+                    self.cache_dir, self.cache_max_mb, self.sample_budget, self.ist.timings is not None,
+                    self.ist.profiles is not None)
+        records = iter(records)
+        pending = deque()
+        with Pool(workers, initializer=_init_worker, initargs=initargs,
+                  maxtasksperchild=max_tasks_per_worker) as pool:
+            while True:
+                while len(pending) < 2 * workers:
+                    chunk = list(islice(records, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(pool.apply_async(_transform_chunk, (chunk, transformations)))
+                if not pending:
+                    break
+                results, counters, timings, profile_stats = pending.popleft().get()
+                for name, count in counters.items():
+                    self.worker_counters[name] = self.worker_counters.get(name, 0) + count
+                merge_timings(self.worker_timings, timings)
+                for key, stats in profile_stats.items():
+                    merge_stats(self.ist.profile_stats.setdefault(key, {}), stats)
+                for item, conversions, rejects, times in results:
+                    # Counted per record, so the counters match the records written so far
+                    for style, count in conversions.items():
+                        conversions_per_style[style] = conversions_per_style.get(style, 0) + count
+                    self.rejects.extend(rejects)
+                    for sample in times:
+                        self.note_time(sample)
+                    yield item
+
+    def run_stream(self, dataset_file: str, transformations: List[str], code_field: str, output_path: str,
+                   workers: int = 1, chunk_size: int = 64, resume: bool = False, checkpoint_every: int = 1000,
+                   shard: Optional[Tuple[int, int]] = None, max_tasks_per_worker: Optional[int] = None):
+        # Read, transform and write the dataset one record at a time, so memory
+        # does not grow with the size of the dataset. For the formats that can
+        # be appended to (jsonl, csv), every checkpoint_every records the output
+        # is flushed and a checkpoint is saved next to it, from which resume
+        # continues the run. The final checkpoint, marked complete, holds the
+        # statistics of the run.
+        conversions_per_style = {style: 0 for style in transformations}
+        input_start, input_end = 0, None
+        if shard is not None:
+            input_start, input_end = shard_range(dataset_file, *shard)
+            output_path = shard_path(output_path, *shard)
+            self.output_path = output_path
+        state = {
+            "dataset_file": os.path.abspath(dataset_file),
+            "language": self.language,
+            "transformations": transformations,
+            "shard": list(shard) if shard is not None else None,
+            "records": 0,           # records written
+            "input_offset": input_start,    # byte offset of the input after the last record written
+            "output_offset": 0,     # size of the output after the last record written
+            "counters": {},         # ist_counters of the run
+            "conversions_per_style": conversions_per_style,
+            "rejected": 0,          # records rejected, see guarded()
+            "rejects_offset": 0,    # size of the rejects file after the last record written
+            "slowest": [],          # [seconds, idx, styles] of the slowest records
+            "complete": False,
+        }
+        ckpt_path = checkpoint_path(output_path)
+        resumable = output_writers[self.output_format].resumable
+        if resume and os.path.exists(ckpt_path):
+            saved = self.load_checkpoint(ckpt_path, state)
+            if saved["complete"]:
+                print(f"Nothing to resume, '{output_path}' is complete.")
+                return
+            if resumable:
+                state = saved
+                conversions_per_style = state["conversions_per_style"]
+                self.logger.info(f"Resuming from record {state['records']} of '{dataset_file}'.")
+                print(f"Resuming after {state['records']} functions.")
+            else:
+                self.logger.warning(f"{self.output_format} output can not be resumed, starting from the beginning.")
+        elif resume:
+            self.logger.warning(f"No checkpoint at '{ckpt_path}', starting from the beginning.")
+
+        self.worker_counters = {}
+        self.rejects = []
+        self.slowest = list(state.get("slowest", []))
+        state.setdefault("rejected", 0)
+        rejects_file = rejects_path(output_path)
+        if os.path.exists(rejects_file):
+            if state["records"]:
+                with open(rejects_file, "r+b") as f:
+                    f.truncate(state.get("rejects_offset", 0))
+            else:
+                os.remove(rejects_file)
+        # Counters as they would have been when the run started, had it not been interrupted
+        start_counters = counter_delta(self.counters(), state["counters"])
+        offsets = deque()       # input offsets of the records read but not written yet
+
+        def read():
+            for end, data in self.iter_dataset_offsets(dataset_file, code_field, state["input_offset"], input_end):
+                offsets.append(end)
+                yield data
+
+        def commit(writer, count):
+            state["records"] = count
+            state["input_offset"] = offsets.popleft()
+            if resumable and checkpoint_every and count % checkpoint_every == 0:
+                state["output_offset"] = writer.sync()
+                state["counters"] = counter_delta(self.counters(), start_counters)
+                note_rejects()
+                save_checkpoint(ckpt_path, state)
+
+        def note_rejects():
+            # Write the rejects of the records written so far
+            state["rejected"] += len(self.rejects)
+            state["rejects_offset"] = self.write_rejects(rejects_file)
+            state["slowest"] = self.slowest_samples()
+
+        if workers > 1:
+            records = self.transform_parallel(read(), transformations, code_field, conversions_per_style,
+                                              workers, chunk_size, max_tasks_per_worker)
+        else:
+            records = self.transform_stream(read(), transformations, code_field, conversions_per_style)
+        count = self.write_records(records, output_path, self.output_format, start=state["records"],
+                                   offset=state["output_offset"] if resumable else None, on_write=commit)
+        self.logger.info(f"Processed dataset saved to '{output_path}' with {count} samples in {self.output_format} format.")
+        state["counters"] = counter_delta(self.counters(), start_counters)
+        note_rejects()
+        if resumable:
+            state["output_offset"] = os.path.getsize(output_path)
+        state["complete"] = True
+        save_checkpoint(ckpt_path, state)
+        self.log_summary(count, transformations, conversions_per_style, state["counters"],
+                         state["rejected"], state["slowest"])
+
+    def merge_shards(self, dataset_file: str, transformations: List[str], output_path: str, num_shards: int):
+        # Concatenate the part files of the num_shards shards of a run into
+        # output_path, in shard order, and sum their statistics
+        self.dataset_file = dataset_file
+        self.output_path = output_path
+        conversions_per_style = {style: 0 for style in transformations}
+        records, counters, rejected, slowest = 0, {}, 0, []
+        states = []
+        for shard in range(num_shards):
+            part = shard_path(output_path, shard, num_shards)
+            expected = {
+                "dataset_file": os.path.abspath(dataset_file),
+                "language": self.language,
+                "transformations": transformations,
+                "shard": [shard, num_shards],
+            }
+            if not os.path.exists(checkpoint_path(part)):
+                raise FileNotFoundError(f"Shard {shard}/{num_shards} has no output at '{part}'.")
+            state = self.load_checkpoint(checkpoint_path(part), expected)
+            if not state["complete"]:
+                raise ValueError(f"Shard {shard}/{num_shards} at '{part}' is not complete.")
+            states.append(state)
+
+        merge_parts([shard_path(output_path, shard, num_shards) for shard in range(num_shards)],
+                    output_path, self.output_format)
+        rejects_parts = [rejects_path(shard_path(output_path, shard, num_shards)) for shard in range(num_shards)]
+        if os.path.exists(rejects_path(output_path)):
+            os.remove(rejects_path(output_path))
+        if any(os.path.exists(part) for part in rejects_parts):
+            merge_parts([part for part in rejects_parts if os.path.exists(part)], rejects_path(output_path), "jsonl")
+        for state in states:
+            records += state["records"]
+            rejected += state.get("rejected", 0)
+            slowest.extend(state.get("slowest", []))
+            for name in ist_counters:
+                counters[name] = counters.get(name, 0) + state["counters"].get(name, 0)
+            for style, count in state["conversions_per_style"].items():
+                conversions_per_style[style] = conversions_per_style.get(style, 0) + count
+        self.logger.info(f"Merged {num_shards} shards into '{output_path}' with {records} samples.")
+        self.log_summary(records, transformations, conversions_per_style, counters, rejected,
+                         heapq.nlargest(self.slowest_count, slowest, key=lambda s: s[0]))
+
+    def load_checkpoint(self, ckpt_path: str, state: dict) -> dict:
+        # The saved state of a run, which must be the run described by state
+        with open(ckpt_path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        saved.setdefault("counters", {})
+        for key in ("dataset_file", "language", "transformations", "shard"):
+            if saved.get(key) != state[key]:
+                raise ValueError(f"Checkpoint '{ckpt_path}' is for {key} {saved.get(key)!r}, not {state[key]!r}.")
+        return saved
+
+    def write_records(self, records: Iterable[dict], output_path: str, output_format: str, start: int = 0,
+                      offset: Optional[int] = None, on_write=None) -> int:
+        # Write the records with the writer of output_format, returning start
+        # plus the number written. With an offset, the output is cut to offset
+        # bytes and the records are appended. on_write(writer, count) is called
+        # after each record.
+        writer = output_writers[output_format](output_path, offset)
+        count = start
+        try:
+            for item in records:
+                writer.write(item)
+                count += 1
+                if on_write is not None:
+                    on_write(writer, count)
+        finally:
+            writer.close()
+        return count
+
+    def counters(self) -> Dict[str, int]:
+        # ist_counters of the IST of this pipeline plus those of its workers
+        return {name: getattr(self.ist, name) + self.worker_counters.get(name, 0) for name in ist_counters}
+
+    def timing_report(self) -> dict:
+        # Calls and seconds of each stage of the transfers, per style and in
+        # total, over the IST of this pipeline and its workers. The prerequisite
+        # stage includes the stages of the prerequisite style, which are also
+        # counted under that style.
+        timings = {}
+        merge_timings(timings, self.ist.timings or {})
+        merge_timings(timings, self.worker_timings)
+        totals = {}
+        for stages in timings.values():
+            for stage, (calls, seconds) in stages.items():
+                if stage != "prerequisite":
+                    entry = totals.setdefault(stage, [0, 0.0])
+                    entry[0] += calls
+                    entry[1] += seconds
+        as_report = lambda stages: {
+            stage: {"calls": calls, "seconds": round(seconds, 6)} for stage, (calls, seconds) in sorted(stages.items())
+        }
+        return {
+            "language": self.language,
+            "styles": {style: as_report(stages) for style, stages in sorted(timings.items())},
+            "totals": as_report(totals),
+        }
+
+    def save_timing_report(self, report_path: str):
+        if os.path.dirname(report_path):
+            os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(self.timing_report(), f, indent=2)
+        print(f"Timing report saved to: {report_path}")
+
+    def log_summary(self, processed: int, transformations: List[str], conversions_per_style: Dict[str, int],
+                    counters: Dict[str, int], rejected: int = 0, slowest: Optional[List[list]] = None):
+        total_converted = sum(conversions_per_style.values())
+        slowest = slowest or []
+        slowest_info = [f"idx {idx} ({seconds:.2f}s, {'/'.join(styles)})" for seconds, idx, styles in slowest]
+        parses_per_function = counters["parse_count"] / max(processed, 1)
+        cache_info = f"{counters['cache_hits']} hits, {counters['cache_misses']} misses"
+        if self.cache_dir:
+            cache_info += (f" (on disk: {counters['disk_cache_hits']} hits,"
+                           f" {counters['disk_cache_misses']} misses)")
+        log_info = (
+            f"Input file: {os.path.basename(self.dataset_file)}\n"
+            f"Output file: {os.path.basename(self.output_path)}\n"
+            f"Language: {self.language}\n"
+            f"Total functions converted: {total_converted}\n"
+            f"Transformations applied: {', '.join(transformations)}\n"
+            f"Conversions per type: {conversions_per_style}\n"
+            f"Parses per function: {parses_per_function:.2f}\n"
+            f"Transform cache: {cache_info}\n"
+            f"Rejected functions: {rejected}\n"
+            f"Slowest functions: {', '.join(slowest_info)}\n"
+            f"Selected fields: {', '.join(self.selected_fields)}"
+        )
+        self.logger.info(log_info)
+        self.logger.info(f"Tree caches: {cache_stats()}")
+
+        print(f"Dataset saved to: {self.output_path}")
+        print(f"Total functions converted: {total_converted}")
+        print(f"Transformation types applied: {', '.join(transformations)}")
+        print(f"Processed {processed} functions.")
+        print(f"Parses per function: {parses_per_function:.2f}")
+        print(f"Transform cache: {cache_info}")
+        if rejected:
+            print(f"Rejected {rejected} functions, see {rejects_path(self.output_path)}")
+        if slowest:
+            print(f"Slowest functions: {', '.join(slowest_info[:5])}")
+
+    def save(self, transformed_snippets: List[dict], output_path: str, output_format: str):
+        count = self.write_records(transformed_snippets, output_path, output_format)
+        self.logger.info(f"Processed dataset saved to '{output_path}' with {count} samples in {output_format} format.")
+
+
+def checkpoint_path(output_path: str) -> str:
+    return output_path + ".ckpt"
+
+
+def save_checkpoint(ckpt_path: str, state: dict):
+    # Replace the checkpoint in one step, so a crash leaves the old or the new one
+    tmp_path = ckpt_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, ckpt_path)
+
+
+# Pipeline of a worker process of TransformPipeline.transform_parallel
+_worker = None
+
+def _init_worker(language: str, code_field: str, selected_fields: List[str], verbose_logging: bool,
+                 cache_size: int, cache_dir: Optional[str], cache_max_mb: int, sample_budget: Optional[float],
+                 timings: bool, profile: bool):
+    global _worker
+    _worker = TransformPipeline(language, code_field, selected_fields, verbose_logging=verbose_logging,
+                                cache_size=cache_size, cache_dir=cache_dir, cache_max_mb=cache_max_mb,
+                                sample_budget=sample_budget, timings=timings)
+    if profile:
+        _worker.ist.profiles = {}
+
+def _transform_chunk(chunk: List[dict], transformations: List[str]):
+    # Transform a chunk of records in a worker, returning each record with the
+    # styles applied to it, its rejects and time, and the ist_counters,
+    # IST.timings and profiles it took
+    counters = _worker.counters()
+    results = []
+    for item in chunk:
+        conversions_per_style = {}
+        _worker.rejects, _worker.slowest = [], []
+        item = _worker.transform_record(item, transformations, _worker.code_field, conversions_per_style)
+        results.append((_worker.select_fields(item), conversions_per_style, _worker.rejects, _worker.slowest))
+    timings = _worker.ist.timings or {}
+    if _worker.ist.timings is not None:
+        _worker.ist.timings = {}
+    profile_stats = {}
+    if _worker.ist.profiles is not None:
+        profile_stats = _worker.ist.collect_profiles()
+        _worker.ist.profile_stats = {}
+    return results, counter_delta(_worker.counters(), counters), timings, profile_stats
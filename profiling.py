@@ -0,0 +1,103 @@
+import os
+import re
+import marshal
+import pstats
+from typing import Dict
+
+
+def merge_stats(stats: dict, other: dict):
+    # Add the cProfile stats other ({func: (cc, nc, tt, ct, callers)}) to stats
+    for func, stat in other.items():
+        stats[func] = pstats.add_func_stats(stats[func], stat) if func in stats else stat
+
+
+def label(func) -> str:
+    filename, lineno, name = func
+    if filename == "~":
+        return name.replace(";", ":")
+    return f"{os.path.basename(filename)}:{name}:{lineno}".replace(";", ":")
+
+
+def collapsed_stacks(stats: dict, max_depth: int = 64, min_time: float = 1e-6) -> Dict[str, float]:
+    # Seconds of self time per call stack ("a;b;c"), the input of flamegraph.pl
+    # and speedscope. cProfile only records caller/callee pairs, so the stacks
+    # are rebuilt from the roots down, giving each call of a function the share
+    # of the function's time that its caller's time on the stack accounts for.
+    callees = {}
+    for func, (cc, nc, tt, ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge
+    stacks = {}
+
+    def reachable(func):
+        seen = {func}
+        todo = [func]
+        while todo:
+            for callee in callees.get(todo.pop(), {}):
+                if callee not in seen:
+                    seen.add(callee)
+                    todo.append(callee)
+        return seen
+
+    def add(stack, seconds):
+        stacks[stack] = stacks.get(stack, 0.0) + seconds
+
+    def walk(func, path, tt, ct):
+        path = path + [label(func)]
+        stack = ";".join(path)
+        add(stack, tt)
+        total_ct = stats[func][3]
+        if not total_ct:
+            return
+        if len(path) >= max_depth:
+            # The calls below the cut are folded into this frame
+            add(stack, ct - tt)
+            return
+        share = ct / total_ct
+        for callee, (_, _, edge_tt, edge_ct) in callees.get(func, {}).items():
+            if label(callee) in path:
+                # Recursion is folded into the first call on the stack, whose
+                # callees already include those of the recursive calls
+                add(";".join(path[:path.index(label(callee)) + 1]), edge_tt * share)
+            elif edge_ct * share < min_time:
+                # So are calls too short to be worth a stack of their own
+                add(stack, edge_ct * share)
+            else:
+                walk(callee, path, edge_tt * share, edge_ct * share)
+
+    for func, (cc, nc, tt, ct, callers) in stats.items():
+        # The calls made before the profile was enabled are not recorded as
+        # callers, so a function's root calls are what its callers leave out.
+        # The cumulative time of a caller that func calls back (recursion)
+        # is inside func's own and is not left out.
+        root_tt = tt - sum(edge[2] for edge in callers.values())
+        if callers and root_tt <= 0:
+            continue
+        inside = reachable(func)
+        root_ct = ct - sum(edge[3] for caller, edge in callers.items() if caller not in inside)
+        walk(func, [], max(root_tt, 0.0), max(root_ct, root_tt, 0.0))
+    return stacks
+
+
+def self_time(stats: dict) -> float:
+    return sum(stat[2] for stat in stats.values())
+
+
+def write_profiles(stats_by_key: Dict[str, dict], directory: str):
+    # Write each profile as directory/<key>.pstats, readable with pstats.Stats
+    # or snakeviz, and all of them as collapsed stacks under their key in
+    # directory/collapsed.txt
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "collapsed.txt"), "w", encoding="utf-8") as collapsed:
+        for key, stats in sorted(stats_by_key.items()):
+            name = re.sub(r"[^\w.+-]", "_", key)
+            with open(os.path.join(directory, f"{name}.pstats"), "wb") as f:
+                marshal.dump(stats, f)
+            stacks = collapsed_stacks(stats)
+            missing = self_time(stats) - sum(stacks.values())
+            if abs(missing) > 1e-6:
+                print(f"Warning: the collapsed stacks of {key} miss {missing:+.6f}s of its self time")
+            for stack, seconds in sorted(stacks.items()):
+                microseconds = round(seconds * 1e6)
+                if microseconds > 0:
+                    collapsed.write(f"{key};{stack} {microseconds}\n")
@@ -0,0 +1,19 @@
+from disk_cache import DiskCache
+
+
+def test_replaced_entries_are_not_counted_twice(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1 << 20)
+    for i in range(100):
+        cache.put(b"key", "x" * 1000 + str(i))
+    assert cache.total == cache.size()
+    assert cache.get(b"key") == "x" * 1000 + "99"
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10000)
+    for i in range(20):
+        cache.put(b"key%d" % i, "x" * 1000)
+    assert cache.size() <= 10000
+    assert cache.get(b"key0") is None and cache.get(b"key19") is not None
+    cache.close()
@@ -0,0 +1,92 @@
+import pytest
+from ist_utils import EditBuffer, EditConflict, replace_from_blob
+from transfer import IST
+
+
+def edit(blob, *operations):
+    buffer = EditBuffer(blob)
+    for operation in operations:
+        buffer.extend(operation)
+    return buffer.text()
+
+
+def test_insert():
+    assert edit("abcdef", [(3, "XY")]) == "abcXYdef"
+    assert edit(b"abcdef", [(0, "<"), (6, ">")]) == b"<abcdef>"
+    # Inserted strings go into bytes as utf-8
+    assert edit(b"ab", [(1, "é")]) == "aéb".encode("utf-8")
+    # Insertions at the same position go longest first
+    assert edit("ab", [(1, "x"), (1, "yy")]) == "ayyxb"
+
+
+def test_delete():
+    # (pos, -n) deletes the n elements left of pos
+    assert edit("abcdef", [(4, -2)]) == "abef"
+    # (pos, k) deletes the elements between k and pos
+    assert edit("abcdef", [(4, 1)]) == "aef"
+    assert edit("abcdef", [(1, 4)]) == "aef"
+
+
+def test_replace():
+    # Deletion and insertion at both of its ends, as the converters replace a node
+    assert edit("if (a) x;", [(9, 7), (7, "{ x; }")]) == "if (a) { x; }"
+    assert edit("abcdef", [(2, 4), (2, "["), (4, "]")]) == "ab[]ef"
+    assert edit("abcdef", [(2, 4)], [(4, 6)]) == "ab"
+    assert replace_from_blob([(5, 0), (0, "new")], "old o") == "new"
+
+
+@pytest.mark.parametrize("operations", [
+    [[(4, 1)], [(5, 3)]],           # deletions overlapping
+    [[(4, 1)], [(2, "x")]],         # insertion inside a deletion
+    [[(2, "x")], [(4, 1)]],         # deletion around an insertion
+    [[(4, 1), (3, -2)]],            # overlap within one operation
+    [[(7, -2)]],                    # outside the blob
+])
+def test_overlapping_edits_are_rejected(operations):
+    buffer = EditBuffer("abcdef")
+    with pytest.raises(EditConflict):
+        for operation in operations:
+            buffer.extend(operation)
+
+
+def test_try_extend_drops_the_whole_operation():
+    buffer = EditBuffer("abcdef")
+    assert buffer.try_extend([(2, 0)])
+    assert not buffer.try_extend([(6, "end"), (3, -2)])
+    assert buffer.conflicts == [[(6, "end"), (3, -2)]]
+    assert buffer.text() == "cdef"
+    assert buffer.try_extend([(6, "end")])
+    assert buffer.text() == "cdefend"
+
+
+def test_changed():
+    assert not EditBuffer("a b").changed()
+    # Identity and whitespace-only edits do not count
+    buffer = EditBuffer("if (a) x;")
+    buffer.extend([(9, 7), (7, "x;")])
+    assert not buffer.changed()
+    buffer = EditBuffer("a  b")
+    buffer.extend([(3, 1), (1, "\n")])
+    assert not buffer.changed()
+    buffer.extend([(4, "c")])
+    assert buffer.changed()
+
+
+def test_conflicts_are_recorded_in_ist():
+    # The nested 1.1 conversions overlap, the inner one is skipped and listed
+    # in IST.conflicts instead of corrupting the outer one
+    code = "int f(int a, int b) {\n    if (a) {\n        if (b) {\n            a = 1;\n        }\n    }\n    return a;\n}\n"
+    ist = IST("c")
+    new_code, succ = ist.transfer(["1.1"], code)
+    assert succ
+    assert new_code == "int f(int a, int b) {\n    if (a)  if (b)             a = 1;\n\n    return a;\n}\n"
+    assert [style for style, _ in ist.conflicts] == ["1.1"]
+    ist.transfer(["1.2"], code)
+    assert ist.conflicts == []
+
+
+def test_add_bracket_indentation():
+    # The insertion at the end of the deleted whitespace goes after it, so 1.2
+    # keeps the statement's indentation
+    code = "int f(int a) {\n    if (a == 0) a = 1;\n    return a;\n}\n"
+    assert IST("c").transfer(["1.2"], code) == ("int f(int a) {\n    if (a == 0) {\n    a = 1;\n}\n    return a;\n}\n", True)
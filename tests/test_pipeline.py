@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import time
+import signal
+import pytest
+from pipeline import TransformPipeline, checkpoint_path
+from transform.transform_bracket import get_indent
+
+needs_alarm = pytest.mark.skipif(not hasattr(signal, "setitimer"), reason="no SIGALRM on this platform")
+
+
+class SlowCode(str):
+    # Code whose length takes a while, so that the timeout lands inside the
+    # bare try/except of get_indent
+    def __len__(self):
+        time.sleep(1)
+        return 1
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    # TransformPipeline logs to transform.log in the working directory
+    monkeypatch.chdir(tmp_path)
+    return TransformPipeline("c", sample_budget=0.05)
+
+
+@needs_alarm
+def test_swallowed_timeout_is_rejected(pipeline):
+    item = {"idx": 7, "func": "int f() {}"}
+    assert pipeline.guarded(item, ["17.1"], lambda: get_indent(5, SlowCode("x"))) is None
+    assert [(r["idx"], r["reason"]) for r in pipeline.rejects] == [(7, "timeout")]
+
+
+@needs_alarm
+def test_swallowed_timeout_fires_again(pipeline):
+    def transform():
+        get_indent(5, SlowCode("x"))
+        time.sleep(5)
+
+    start = time.perf_counter()
+    assert pipeline.guarded({"idx": 8, "func": "int f() {}"}, ["17.1"], transform) is None
+    assert time.perf_counter() - start < 2
+    assert pipeline.rejects[0]["reason"] == "timeout"
+
+
+styles = ["11.1", "3.2", "1.1", "2.1"]
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    # jsonl of 30 generated C functions, with a blank and a malformed line
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmark"))
+    from gen_corpus import generate_program
+
+    path = tmp_path / "data.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(30):
+            code = generate_program("c", functions=1, depth=2, seed=i)
+            f.write(json.dumps({"idx": i, "func": code, "target": i % 2}) + "\n")
+            if i == 10:
+                f.write("\n{not json\n")
+    return str(path)
+
+
+def run(dataset, output_path, output_format="jsonl", interrupt_at=None, **kwargs):
+    # TransformPipeline.run, stopped with a KeyboardInterrupt when it starts on
+    # the interrupt_at-th record
+    pipeline = TransformPipeline("c", output_format=output_format)
+    if interrupt_at is not None:
+        transform_record = pipeline.transform_record
+        calls = []
+
+        def interrupted(*args):
+            calls.append(None)
+            if len(calls) == interrupt_at:
+                raise KeyboardInterrupt
+            return transform_record(*args)
+
+        pipeline.transform_record = interrupted
+        with pytest.raises(KeyboardInterrupt):
+            pipeline.run(dataset, styles, output_path, **kwargs)
+        return
+    pipeline.run(dataset, styles, output_path, **kwargs)
+
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("output_format", ["jsonl", "csv"])
+def test_resume_after_interrupt(tmp_path, monkeypatch, dataset, output_format):
+    monkeypatch.chdir(tmp_path)
+    full, resumed = f"full.{output_format}", f"resumed.{output_format}"
+    run(dataset, full, output_format)
+    run(dataset, resumed, output_format, interrupt_at=18, checkpoint_every=5)
+    with open(checkpoint_path(resumed), encoding="utf-8") as f:
+        state = json.load(f)
+    # Records were written after the last checkpoint, which resume cuts off
+    assert state["records"] == 15 and os.path.getsize(resumed) > state["output_offset"]
+    run(dataset, resumed, output_format, resume=True, checkpoint_every=5)
+    assert read_bytes(resumed) == read_bytes(full)
+    with open(checkpoint_path(resumed), encoding="utf-8") as f:
+        state = json.load(f)
+    with open(checkpoint_path(full), encoding="utf-8") as f:
+        assert state["conversions_per_style"] == json.load(f)["conversions_per_style"]
+    assert state["complete"] and state["records"] == 30
+    assert any(state["conversions_per_style"].values())
+
+
+@pytest.mark.parametrize("output_format", ["jsonl", "csv"])
+@pytest.mark.parametrize("num_shards", [1, 3, 7])
+def test_merged_shards_match_single_run(tmp_path, monkeypatch, dataset, output_format, num_shards):
+    monkeypatch.chdir(tmp_path)
+    single, merged = f"single.{output_format}", f"merged.{output_format}"
+    run(dataset, single, output_format)
+    for shard in range(num_shards):
+        run(dataset, merged, output_format, shard=(shard, num_shards))
+    # The line index of the input is built by the first shard and reused
+    assert os.path.exists(dataset + ".idx")
+    TransformPipeline("c", output_format=output_format).merge_shards(dataset, styles, merged, num_shards)
+    assert read_bytes(merged) == read_bytes(single)
+    if output_format == "csv":
+        header = read_bytes(single).split(b"\n", 1)[0]
+        assert header.startswith(b"idx,func,target") and read_bytes(merged).count(header) == 1
@@ -0,0 +1,97 @@
+import os
+import sys
+import random
+import itertools
+import pytest
+from transfer import IST
+
+test_code_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test_code")
+
+
+def read_code(name):
+    with open(os.path.join(test_code_dir, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture(scope="module")
+def c_code():
+    return read_code("test.c")
+
+
+@pytest.mark.parametrize("setting, values", [("change_check", ["edits", "tokens"]), ("fuse", [True, False])])
+def test_cache_keys_settings(c_code, setting, values):
+    # An IST whose settings change between transfers never returns a result
+    # cached under other settings
+    ist = IST("c", cache_size=16)
+    for value in values:
+        setattr(ist, setting, value)
+        ist.transfer(["11.1", "3.2"], c_code)
+        ist.try_transfer("1.1", c_code)
+    assert ist.cache_hits == 0
+    assert ist.cache_misses == 2 * len(values)
+
+
+def test_func_not_nested_names_only_depend_on_code():
+    # 20.2 numbers its temp_result_N after those already in the code, so the
+    # result does not depend on the samples transformed before (or cached)
+    code = "int f(int a) { return g(h(a)); }\n"
+    ist = IST("c")
+    first, succ = ist.transfer(["20.2"], code)
+    assert succ and "temp_result_0" in first
+    assert ist.transfer(["20.2"], code) == (first, True)
+    assert IST("c").transfer(["20.2"], "int k;\n" + code)[0] == "int k;\n" + first
+    # A temp_result_0 of an earlier 20.2 is not declared again
+    again, _ = ist.transfer(["20.2"], first + "int k(int b) { return g(h(b)); }\n")
+    assert again.count("temp_result_0 =") == 1 and "temp_result_1 = h(b)" in again
+
+
+def test_dynamic_rematches_after_top_level_change():
+    # The first conversion adds a top-level declaration, after which the
+    # remaining matches are found by rematching the whole tree
+    def match(scope):
+        nodes = [scope] if scope.type == "declaration" else scope.children
+        return [node for node in nodes if node.type == "declaration" and b"old" in node.text]
+
+    def convert(node):
+        new = node.text.decode("utf-8").replace("old", "new")
+        if new == "int new1;":
+            new += "\nint extra;"
+        return [(node.end_byte, node.start_byte), (node.start_byte, new)]
+
+    ist = IST("c")
+    code = b"int a;\nint old1;\nint old2;\nint old3;\n"
+    new_code, buffers = ist.transfer_dynamic(code, ist.parse(code), match, convert, "test")
+    assert new_code == b"int a;\nint new1;\nint extra;\nint new2;\nint new3;\n"
+    assert len(buffers) == 3
+
+
+def outcome(ist, chain, code):
+    try:
+        return ist.transfer(chain, code), list(ist.outcomes)
+    except Exception as e:
+        # Styles needing a resource missing here (the tokenizer of 0.x) fail
+        # the same way fused or not
+        return type(e).__name__
+
+
+@pytest.mark.parametrize("language, name", [("c", "test.c"), ("java", "test.java"), ("c", None), ("java", None)])
+def test_fused_chains_match_sequential(language, name):
+    # A chain whose fusible styles are planned on one tree gives the same code,
+    # success and outcomes as running its styles one after another
+    if name is None:
+        sys.path.insert(0, os.path.join(os.path.dirname(test_code_dir), "benchmark"))
+        from gen_corpus import generate_program
+
+        code = generate_program(language, functions=3, seed=1)
+    else:
+        code = read_code(name)
+    fused, sequential = IST(language), IST(language)
+    sequential.fuse = False
+    fusible = [s for s in fused.style_dict if fused.fusible(s) and s not in fused.random_styles]
+    others = [s for s in fused.style_dict if not fused.fusible(s) and s not in fused.random_styles]
+    rng = random.Random(0)
+    chains = [list(pair) for pair in itertools.permutations(fusible, 2)]
+    chains += [rng.sample(fusible, 4) for _ in range(100)]
+    chains += [rng.sample(fusible, 2) + [rng.choice(others)] + rng.sample(fusible, 2) for _ in range(100)]
+    for chain in chains:
+        assert outcome(fused, chain, code) == outcome(sequential, chain, code), chain
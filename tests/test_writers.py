@@ -0,0 +1,70 @@
+import json
+import pytest
+from writers import output_writers, merge_parts
+
+records = [
+    {"idx": 0, "func": "int f() { return 0; }", "target": 1, "label": 1},
+    {"idx": 1, "func": "int g() { return 1; }", "target": 0, "label": None},
+]
+
+
+def read_output(path, output_format):
+    if output_format == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+    if output_format == "csv":
+        with open(path, encoding="utf-8") as f:
+            return f.read().splitlines()
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path).to_pylist()
+    from datasets import load_from_disk
+
+    return load_from_disk(path).to_list()
+
+
+@pytest.mark.parametrize("output_format", ["jsonl", "csv", "parquet", "dataset"])
+def test_write_to_new_directory(tmp_path, output_format):
+    if output_format in ("parquet", "dataset"):
+        pytest.importorskip("pyarrow")
+    if output_format == "dataset":
+        pytest.importorskip("datasets")
+    path = str(tmp_path / "processed_data" / "train_processed")
+    writer = output_writers[output_format](path)
+    for item in records:
+        writer.write(item)
+    writer.close()
+
+    rows = read_output(path, output_format)
+    if output_format == "jsonl":
+        assert rows == records
+    elif output_format == "csv":
+        assert rows == ["idx,func,target,label", "0,int f() { return 0; },1,1", "1,int g() { return 1; },0,"]
+    else:
+        # Columnar formats keep idx and target as integers, other fields as strings
+        assert rows == [dict(item, label=None if item["label"] is None else str(item["label"])) for item in records]
+
+
+@pytest.mark.parametrize("part_records", [[records[:1], [], records[1:]], [[], []]])
+def test_merge_parquet_parts(tmp_path, part_records):
+    pytest.importorskip("pyarrow")
+    parts = []
+    for i, items in enumerate(part_records):
+        parts.append(str(tmp_path / f"out.part-{i}-of-{len(part_records)}.parquet"))
+        writer = output_writers["parquet"](parts[-1])
+        for item in items:
+            writer.write(item)
+        writer.close()
+    single = str(tmp_path / "single.parquet")
+    writer = output_writers["parquet"](single)
+    for items in part_records:
+        for item in items:
+            writer.write(item)
+    writer.close()
+
+    merged = str(tmp_path / "merged" / "out.parquet")
+    merge_parts(parts, merged, "parquet")
+    import pyarrow.parquet as pq
+
+    assert pq.read_table(merged).equals(pq.read_table(single))
@@ -2,18 +2,32 @@ import sys, os
 
 sys.path.insert(0, os.path.dirname(__file__))
 import json
+import time
+import hashlib
 import random
 import argparse
 import subprocess
+from collections import OrderedDict
+from contextlib import contextmanager
 from ist_utils import *
 from tqdm import tqdm
 from tree_sitter import Parser, Language
 from seeTree import *
 
 
+class FusedRun:
+    # Edits of consecutive fusible styles of a chain, planned on the same code
+    def __init__(self, code):
+        self.code = code
+        self.buffer = EditBuffer(code)
+        self.inserted = []      # strings inserted by the planned styles
+        self.snippet = None     # (tree, start) of the inserted strings, see IST.parse_inserted
+
+
 class IST:
-    def __init__(self, language, expand=0):
+    def __init__(self, language, expand=0, cache_size=0, cache_dir=None, cache_max_bytes=1 << 30):
         self.language = language
+        self.expand = expand
         parent_dir = os.path.dirname(__file__)
         languages_so_path = os.path.join(
             parent_dir, "build", f"{language}-languages.so"
@@ -44,14 +58,67 @@ class IST:
             # os.system(f'rm -rf ./tree-sitter-{language}')
 
         parser = Parser()
-        parser.set_language(Language(languages_so_path, language))
+        self.ts_language = Language(languages_so_path, language)
+        parser.set_language(self.ts_language)
         self.parser = parser
 
+        # Parse trees of the most recent code strings, so that a style chain
+        # (and its prerequisites) only reparses code that an edit changed.
+        self.trees = OrderedDict()
+        self.max_trees = 8
+        self.parse_count = 0
+
+        # Results of the most recent transfers, keyed by the hash of the code and
+        # what the result depends on besides it, see cached(). Off when cache_size is 0.
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # Results of earlier runs, kept in cache_dir and keyed as above plus the
+        # version of the IST sources and grammar, see version(). Off without cache_dir.
+        self.disk_cache = None
+        self.disk_key_prefix = None
+        self.disk_cache_hits = 0
+        self.disk_cache_misses = 0
+        if cache_dir:
+            from disk_cache import DiskCache
+
+            self.disk_cache = DiskCache(cache_dir, cache_max_bytes)
+
+        # Compiled tree-sitter queries of the structural matchers, by name
+        self.queries = {}
+
+        # (style, operation) of the conversions whose edits overlapped the
+        # edits of other conversions during the last transfer, and were skipped
+        self.conflicts = []
+
+        # (style, outcome) of the styles of the last transfer, where outcome is
+        # "changed", "unchanged" or "no-match"
+        self.outcomes = []
+
+        # How a style is decided to have changed the code: "edits" compares the
+        # regions its edits touched, "tokens" compares the token sequences of
+        # the code before and after it, see code_changed()
+        self.change_check = "edits"
+
+        # Wall time and calls of the stages of the transfers, by style:
+        # {style: {stage: [calls, seconds]}}. Recorded while it is a dict, see timed().
+        self.timings = None
+        self.current_style = None   # style being transferred, the stages are recorded under it
+
+        # cProfile.Profile of the transfers of each style (or chain), while
+        # profiling, and the stats collected from them so far, see profile()
+        self.profiles = None
+        self.profile_stats = {}
+        self.profiling = False      # a transfer is being profiled
+
         from transform.config import transformation_operators as op
-        from transform.lang import set_lang, set_expand
+        from transform.lang import set_lang, set_expand, set_query
 
         set_lang(language)
         set_expand(expand)
+        set_query(self.get_query)
 
         self.op = op
 
@@ -145,29 +212,229 @@ class IST:
         }
 
         self.need_bracket = ["10", "11", "12", "17"]
+        self.dynamic_styles = ["20.1", "20.2"]
+        # Styles that pick their edit at random, which is never cached
+        self.random_styles = ["-3.1", "-2.1", "-2.2", "-2.3", "-2.4"]
+        # Plan runs of fusible styles in a chain on one tree and apply their
+        # edits together, see fusible()
+        self.fuse = True
         self.exclude = {"java": ["5", "6"], "c": [], "c_sharp": [], "python": []}
 
+    def parse(self, code):
+        # Return the parse tree of code (str or utf-8 bytes), reusing the tree of
+        # identical code parsed recently instead of calling the parser again.
+        code = code.encode("utf-8") if isinstance(code, str) else bytes(code)
+        tree = self.trees.get(code)
+        if tree is not None:
+            self.trees.move_to_end(code)
+            return tree
+        with self.timed("parse"):
+            tree = self.parser.parse(code)
+        self.parse_count += 1
+        self.trees[code] = tree
+        if len(self.trees) > self.max_trees:
+            self.trees.popitem(last=False)
+        return tree
+
+    @contextmanager
+    def timed(self, stage, style=None):
+        # Add the wall time of the block to stage of style (by default the
+        # style being transferred) in timings, when they are recorded. The
+        # stages are parse, match, convert, edits (planning and applying the
+        # edit script), check (whether the style changed the code) and
+        # prerequisite (the whole transfer of a prerequisite style).
+        if self.timings is None:
+            yield
+            return
+        style = style or self.current_style or "-"
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.timings.setdefault(style, {}).setdefault(stage, [0, 0.0])
+            entry[0] += 1
+            entry[1] += time.perf_counter() - start
+
+    @contextmanager
+    def profile(self, directory):
+        # Profile the transfers made in the block with cProfile, one profile per
+        # style of try_transfer and per chain of transfer, and write them to
+        # directory as .pstats files and collapsed stacks, see profiling.py
+        from profiling import write_profiles
+
+        self.profiles = {}
+        try:
+            yield self
+        finally:
+            stats = self.collect_profiles()
+            self.profiles = None
+            write_profiles(stats, directory)
+
+    @contextmanager
+    def profiled(self, styles):
+        if self.profiles is None or self.profiling:
+            # Not profiling, or inside a transfer that is profiled already
+            yield
+            return
+        key = "+".join(styles)
+        if key not in self.profiles:
+            import cProfile
+
+            self.profiles[key] = cProfile.Profile()
+        self.profiling = True
+        self.profiles[key].enable()
+        try:
+            yield
+        finally:
+            self.profiles[key].disable()
+            self.profiling = False
+
+    def collect_profiles(self):
+        # Add the profiles recorded so far to profile_stats and return it
+        from profiling import merge_stats
+
+        for key, profile in (self.profiles or {}).items():
+            profile.create_stats()
+            merge_stats(self.profile_stats.setdefault(key, {}), profile.stats)
+        if self.profiles:
+            self.profiles = {}
+        return self.profile_stats
+
+    def get_query(self, name):
+        # Compile the named matcher query for this language once and cache it
+        if name not in self.queries:
+            from transform.query import query_sources
+
+            source = query_sources.get(name, {}).get(self.language)
+            self.queries[name] = (
+                self.ts_language.query(source) if source is not None else None
+            )
+        return self.queries[name]
+
+    def version(self):
+        # Fingerprint of the code and grammar the transfers of this IST depend on
+        from disk_cache import source_fingerprint
+
+        parent_dir = os.path.dirname(os.path.abspath(__file__))
+        transform_dir = os.path.join(parent_dir, "transform")
+        paths = [
+            os.path.join(parent_dir, "transfer.py"),
+            os.path.join(parent_dir, "ist_utils.py"),
+            os.path.join(parent_dir, "build", f"{self.language}-languages.so"),
+        ] + [
+            os.path.join(transform_dir, name)
+            for name in os.listdir(transform_dir)
+            if name.endswith(".py")
+        ]
+        return source_fingerprint(paths)
+
+    def cached(self, kind, styles, code, compute):
+        # Return compute(), the result of the transfer kind of styles on code,
+        # from the cache if the same code went through the same styles before.
+        # The conflicts and outcomes of the transfer are restored with it.
+        # Chains with a randomized style are always computed, so each call
+        # draws a new result as it does without the caches, and no draw is
+        # persisted in the disk cache for later runs.
+        if not self.cache_size and self.disk_cache is None:
+            return compute()
+        if any(style in self.random_styles for style in styles):
+            return compute()
+        blob = code.encode("utf-8") if isinstance(code, str) else bytes(code)
+        key = (
+            kind,
+            hashlib.blake2b(blob, digest_size=16).digest(),
+            isinstance(code, str),
+            self.language,
+            tuple(styles),
+            self.expand,
+            self.change_check,
+            self.fuse,
+        )
+        entry = self.cache.get(key) if self.cache_size else None
+        if entry is not None:
+            self.cache_hits += 1
+            self.cache.move_to_end(key)
+        else:
+            self.cache_misses += 1
+            if self.disk_cache is not None:
+                if self.disk_key_prefix is None:
+                    self.disk_key_prefix = repr((self.version(), sys.version_info[:2])).encode("utf-8")
+                disk_key = hashlib.blake2b(self.disk_key_prefix + repr(key).encode("utf-8"), digest_size=16).digest()
+                entry = self.disk_cache.get(disk_key)
+                if entry is None:
+                    self.disk_cache_misses += 1
+                else:
+                    self.disk_cache_hits += 1
+            if entry is None:
+                result = compute()
+                entry = (result, list(self.conflicts), list(self.outcomes))
+                if self.disk_cache is not None:
+                    self.disk_cache.put(disk_key, entry)
+            if self.cache_size:
+                self.cache[key] = entry
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        result, conflicts, outcomes = entry
+        self.conflicts, self.outcomes = list(conflicts), list(outcomes)
+        return result
+
     def transfer(self, styles=[], code=""):
-        orig_code = code
         if not isinstance(styles, list):
             styles = [styles]
         if len(styles) == 0:
             return code, 0
+        with self.profiled(styles):
+            return self.cached("transfer", styles, code, lambda: self.transfer_uncached(styles, code))
+
+    def transfer_uncached(self, styles, code):
         succs = []
+        self.conflicts = []
+        self.outcomes = []
+        # The styles edit the utf-8 bytes of code, which the byte offsets of the
+        # nodes index directly, and the result is decoded once at the end
+        is_str = isinstance(code, str)
+        code = code.encode("utf-8") if is_str else bytes(code)
+        output = lambda blob: blob.decode("utf-8") if is_str else blob
+        run = None      # FusedRun of the fusible styles planned on code so far
         # print(styles)
         for style in styles:
+            self.current_style = style
+            if self.fuse and self.fusible(style):
+                run = run or FusedRun(code)
+                try:
+                    own = self.fuse_style(style, run)
+                except EditConflict:
+                    # The style looks at code that an earlier style of the run
+                    # edits, so it runs on the code the run produces instead
+                    code = self.apply_fused(run)
+                    run = FusedRun(code)
+                    own = self.fuse_style(style, run)
+                if own is None:
+                    self.outcomes.append((style, "no-match"))
+                    return output(self.apply_fused(run)), style == "0.0"
+                self.conflicts.extend((style, op) for op in own.conflicts)
+                with self.timed("check"):
+                    succ = self.code_changed(run.code, [own])
+                self.outcomes.append((style, "changed" if succ else "unchanged"))
+                succs.append(int(succ))
+                continue
+            code, run = self.apply_fused(run) if run else code, None
             if style == "8.1":
                 if self.get_style(code=code, styles=["8.1"])["8.1"] > 0:
+                    self.outcomes.append((style, "unchanged"))
                     succs.append(int(1))
                     continue
-            raw_code = code
             # if self.get_style(code, style)[style] > 0: return code, 1
             if style in self.exclude[self.language]:
+                self.outcomes.append((style, "no-match"))
                 continue
+            pre = None
             if style in self.need_bracket:
-                code, _ = self.transfer(["1.2"], code)
+                with self.timed("prerequisite", style):
+                    code, pre = self.transfer_style("1.2", code)
             if style.split(".")[0] == "10":
-                code, _ = self.transfer(["11.1"], code)
+                with self.timed("prerequisite", style):
+                    code, pre = self.transfer_style("11.1", code)
             # if style == "-3.1":
             #     sys.path.append(
             #         "/home/nfs/share/backdoor2023/backdoor/Authorship-Attribution/dataset"
@@ -179,62 +446,279 @@ class IST:
             #     )
             #     succs.append(int(succ))
             #     continue
-            AST = self.parser.parse(bytes(code, encoding="utf-8"))
+            code, succ = self.transfer_style(style, code)
+            if succ is None:
+                self.outcomes.append((style, "no-match"))
+                return output(code), style == "0.0"
+            # The prerequisite style's changes count as changes of the style
+            succ = succ or bool(pre)
+            self.outcomes.append((style, "changed" if succ else "unchanged"))
+            # if succ and len(code.replace(" ", "")) <= 400:
+            #     print(code)
+            succs.append(int(succ))
+        if run:
+            code = self.apply_fused(run)
+        # print(succs)
+        return output(code), 0 not in succs
+        # return code, 1 in succs
+
+    def try_transfer(self, style, code=""):
+        # Apply a single style, matching it only once: returns the number of
+        # nodes the style applies to, the new code and whether the style changed
+        # it. When the count is 0 the code is returned unchanged. The count of a
+        # style with a prerequisite style is taken on the code the prerequisite
+        # produces.
+        with self.profiled([style]):
+            return self.cached("try_transfer", [style], code, lambda: self.try_transfer_uncached(style, code))
+
+    def try_transfer_uncached(self, style, code):
+        self.conflicts = []
+        self.outcomes = []
+        self.current_style = style
+        is_str = isinstance(code, str)
+        blob = code.encode("utf-8") if is_str else bytes(code)
+        if style == "8.1" or style in self.exclude[self.language]:
+            # Handled by transfer, where these count as success without an edit
+            (style_type, style_subtype) = self.style_dict[style]
+            AST = self.parse(blob)
+            with self.timed("match"):
+                count = len(self.op[style_type][style_subtype][0](AST.root_node))
+            if count == 0:
+                self.outcomes.append((style, "no-match"))
+                return 0, code, False
+            new_code, succ = self.transfer_uncached([style], code)
+            return count, new_code, bool(succ)
+        pre = None
+        if style in self.need_bracket:
+            with self.timed("prerequisite", style):
+                blob, pre = self.transfer_style("1.2", blob)
+        if style.split(".")[0] == "10":
+            with self.timed("prerequisite", style):
+                blob, pre = self.transfer_style("11.1", blob)
+        (style_type, style_subtype) = self.style_dict[style]
+        AST = self.parse(blob)
+        with self.timed("match"):
+            match_nodes = self.op[style_type][style_subtype][0](AST.root_node)
+        if len(match_nodes) == 0:
+            self.outcomes.append((style, "no-match"))
+            return 0, code, False
+        blob, succ = self.transfer_style(style, blob, match_nodes)
+        succ = succ or bool(pre)
+        self.outcomes.append((style, "changed" if succ else "unchanged"))
+        return len(match_nodes), blob.decode("utf-8") if is_str else blob, succ
+
+    def transfer_style(self, style, code, match_nodes=None):
+        # Apply a single style to the utf-8 bytes code, returning the new bytes and
+        # whether the style changed them, or None as success when nothing matched.
+        # match_nodes are the matches of the style on code, if already known.
+        previous_style, self.current_style = self.current_style, style
+        try:
+            AST = self.parse(code)
             (style_type, style_subtype) = self.style_dict[style]
             (match_func, convert_func, _) = self.op[style_type][style_subtype]
-            operations = []
-            match_nodes = match_func(AST.root_node)
+            if match_nodes is None:
+                with self.timed("match"):
+                    match_nodes = match_func(AST.root_node)
             if len(match_nodes) == 0:
-                return code, style == "0.0"
+                return code, None
 
             # 对于特定风格使用动态AST解析
-            dynamic_styles = ["20.1", "20.2"]
-            if style in dynamic_styles:
-                while len(match_nodes) > 0:
-                    # 每次只处理第一个匹配的节点
-                    node = match_nodes[0]
+            if style in self.dynamic_styles:
+                new_code, buffers = self.transfer_dynamic(code, AST, match_func, convert_func, style)
+            else:
+                # 原有的批量处理逻辑
+                view = byte_view(code)
+                with self.timed("convert"):
                     if get_parameter_count(convert_func) == 1:
-                        op = convert_func(node)
+                        ops = [convert_func(node) for node in match_nodes]
                     else:
-                        op = convert_func(node, code)
-                    if op is not None:
-                        operations.extend(op)
-                        # 应用当前操作并重新解析AST
-                        code = replace_from_blob(operations, code)
-                        operations = []
-                        # 重新获取匹配节点
-                        AST = self.parser.parse(bytes(code, encoding="utf-8"))
-                        match_nodes = match_func(AST.root_node)
+                        ops = [convert_func(node, view) for node in match_nodes]
+                with self.timed("edits"):
+                    buffer = EditBuffer(code)
+                    for op in ops:
+                        if op is not None and not buffer.try_extend(op):
+                            self.conflicts.append((style, op))
+                    new_code, buffers = buffer.text(), [buffer]
+            with self.timed("check"):
+                return new_code, self.code_changed(code, buffers, new_code)
+        finally:
+            self.current_style = previous_style
+
+    def code_changed(self, code, buffers, new_code=None):
+        # Whether the edits of buffers, applied one after another to code, change
+        # it other than in whitespace. With change_check "edits" only the edited
+        # regions are compared, with "tokens" the hashes of the token sequences.
+        if self.change_check == "tokens":
+            if new_code is None:
+                new_code = buffers[-1].text()
+            return self.token_hash(code) != self.token_hash(new_code)
+        return any(buffer.changed() for buffer in buffers)
+
+    def token_hash(self, code):
+        return hashlib.md5("\0".join(self.tokenize(code)).encode("utf-8")).digest()
+
+    def fusible(self, style):
+        # Whether the conversions of style only rewrite the nodes they matched:
+        # the converter does not look at the code around the node, and the
+        # style has no prerequisite style or special handling in transfer.
+        # Consecutive fusible styles are planned on the same tree and applied as
+        # one edit script, see fuse_style.
+        if style in self.dynamic_styles or style in self.need_bracket or style == "8.1":
+            return False
+        if style.split(".")[0] == "10" or style in self.exclude[self.language]:
+            return False
+        if style == "-3.1":
+            # Its matcher picks a random variable and leaves state for the converter
+            return False
+        (style_type, style_subtype) = self.style_dict[style]
+        operator = self.op.get(style_type, {}).get(style_subtype, ())
+        return len(operator) >= 2 and get_parameter_count(operator[1]) == 1
+
+    def fuse_style(self, style, run):
+        # Convert the matches of the fusible style on the tree of run.code, the
+        # code before the styles of the run, and add the operations to the run.
+        # Returns the EditBuffer of the style's own edits, or None when nothing
+        # matched. Raises EditConflict, leaving the run as it was, when the
+        # result could differ from running the style after the earlier styles
+        # of the run: a node of the types its matcher looked at overlaps their
+        # edits, the matcher matches in the strings they insert, or the style's
+        # edits overlap theirs.
+        import ist_utils
+
+        AST = self.parse(run.code)
+        (style_type, style_subtype) = self.style_dict[style]
+        (match_func, convert_func, _) = self.op[style_type][style_subtype]
+        ist_utils.type_log = []
+        try:
+            with self.timed("match"):
+                match_nodes = match_func(AST.root_node)
+            types = ist_utils.type_log
+        finally:
+            ist_utils.type_log = None
+        if run.buffer.edits:
+            if not types or None in types:
+                # No types logged means the matcher walked the tree itself
+                raise EditConflict(f"style {style} looks at every node")
+            candidate_types = set()
+            for t in types:
+                candidate_types.update([t] if isinstance(t, str) else t)
+            for node in find_nodes(AST.root_node, list(candidate_types)):
+                if run.buffer.overlaps(node.start_byte, node.end_byte):
+                    raise EditConflict(f"style {style} looks at code edited by an earlier style")
+            snippet, start = self.parse_inserted(run)
+            if any(node.start_byte >= start for node in match_func(snippet.root_node)):
+                raise EditConflict(f"style {style} matches code inserted by an earlier style")
+        if len(match_nodes) == 0:
+            return None
+        with self.timed("convert"):
+            ops = [convert_func(node) for node in match_nodes]
+        with self.timed("edits"):
+            own = EditBuffer(run.code)
+            for op in ops:
+                if op is not None:
+                    own.try_extend(op)
+            run.buffer.extend(own.operations)
+        run.inserted.extend(op[1] for op in own.operations if type(op[1]) is str)
+        run.snippet = None
+        return own
+
+    def parse_inserted(self, run):
+        # Parse tree of the strings inserted by the styles of the run, each as a
+        # statement of a function body, and the byte offset where they start
+        if run.snippet is None:
+            prefix = {"java": "class A{void f(){\n"}.get(self.language, "void f(){\n")
+            suffix = {"java": "}}"}.get(self.language, "}")
+            body = ";\n".join(run.inserted)
+            blob = (prefix + body + ";\n" + suffix).encode("utf-8")
+            run.snippet = (self.parser.parse(blob), len(prefix.encode("utf-8")))
+        return run.snippet
+
+    def apply_fused(self, run):
+        # Apply the edits of the styles of the run in one pass. The result is
+        # parsed once, when a later style or get_style needs its tree.
+        if not run.buffer.edits:
+            return run.code
+        with self.timed("edits", "fused"):
+            return run.buffer.text()
+
+    def transfer_dynamic(self, code, AST, match_func, convert_func, style=None):
+        # Convert one matched node at a time, feeding each edit to the tree so
+        # that tree-sitter reparses incrementally, and only rematch the
+        # top-level declaration the edit happened in.
+        root = AST.root_node
+        n_scopes = root.child_count
+        i = 0
+        view = byte_view(code)
+        buffers = []
+        while i < n_scopes:
+            if root.child_count == n_scopes:
+                scope = root.children[i]
             else:
-                # 原有的批量处理逻辑
-                for node in match_nodes:
+                # The edit changed the top-level layout, rematch everything
+                # until no convertible node is left
+                scope, n_scopes, i = root, 1, 0
+            with self.timed("match"):
+                match_nodes = match_func(scope)
+            for node in match_nodes:
+                with self.timed("convert"):
                     if get_parameter_count(convert_func) == 1:
                         op = convert_func(node)
                     else:
-                        op = convert_func(node, code)
-                    if op is not None:
-                        operations.extend(op)
-
-                #print(f'Operations: {operations}')
-                code = replace_from_blob(operations, code)
-            succ = raw_code.replace(" ", "").replace("\n", "").replace(
-                "\t", ""
-            ) != code.replace(" ", "").replace("\n", "").replace("\t", "")
-            # if succ and len(code.replace(" ", "")) <= 400:
-            #     print(code)
-            succs.append(int(succ))
-        # print(succs)
-        return code, 0 not in succs
-        # return code, 1 in succs
+                        op = convert_func(node, view)
+                if op is None:
+                    continue
+                buffer = EditBuffer(code)
+                with self.timed("edits"):
+                    extended = buffer.try_extend(op)
+                if extended:
+                    break
+                self.conflicts.append((style, op))
+            else:
+                # No (more) convertible node in this declaration
+                i += 1
+                continue
+            buffers.append(buffer)
+            with self.timed("edits"):
+                new_code = buffer.text()
+            AST = self.reparse(AST, code, new_code, op)
+            code = new_code
+            view = byte_view(code)
+            root = AST.root_node
+        return code, buffers
+
+    def reparse(self, AST, code, new_code, operation):
+        # Parse the bytes new_code, which is code after applying operation, reusing AST
+        if self.trees.get(code) is AST:
+            # The cached tree must keep describing code, so it is no longer shared
+            del self.trees[code]
+        if new_code in self.trees:
+            return self.parse(new_code)
+        start, end = get_operation_range(operation)
+        new_end = end + len(new_code) - len(code)
+        AST.edit(
+            start_byte=start,
+            old_end_byte=end,
+            new_end_byte=new_end,
+            start_point=get_point(code, start),
+            old_end_point=get_point(code, end),
+            new_end_point=get_point(new_code, new_end),
+        )
+        with self.timed("parse"):
+            AST = self.parser.parse(new_code, AST)
+        self.parse_count += 1
+        self.trees[new_code] = AST
+        if len(self.trees) > self.max_trees:
+            self.trees.popitem(last=False)
+        return AST
 
     def get_style(self, code="", styles=[]):
         if not isinstance(styles, list):
             styles = [styles]
         res = {}
         if len(styles) == 0:
-            styles = list(self.style_dict[self.language].keys())
+            return self.get_style_profile(code)
+        AST = self.parse(code)
         for style in styles:
-            AST = self.parser.parse(bytes(code, encoding="utf-8"))
             (style_type, style_subtype) = self.style_dict[style]
             (_, _, count_func) = self.op[style_type][style_subtype]
             if style in res:
@@ -243,19 +727,37 @@ class IST:
                 res[style] = count_func(AST.root_node)
         return res
 
+    def get_style_profile(self, code=""):
+        # Count every style that has a count function from a single parse. The
+        # counters look up their nodes through find_nodes, so the tree is walked
+        # once and each counter only visits the node types it is interested in.
+        AST = self.parse(code)
+        counts = {}
+        res = {}
+        for style, (style_type, style_subtype) in self.style_dict.items():
+            operator = self.op.get(style_type, {}).get(style_subtype, ())
+            if len(operator) < 3:
+                continue
+            count_func = operator[2]
+            if count_func not in counts:
+                count = count_func(AST.root_node)
+                counts[count_func] = len(count) if isinstance(count, list) else int(count)
+            res[style] = counts[count_func]
+        return res
+
     def tokenize(self, code):
-        tree = self.parser.parse(bytes(code, "utf8"))
+        tree = self.parse(code)
         root_node = tree.root_node
         tokens = []
         tokenize_help(root_node, tokens)
         return tokens
 
     def check_syntax(self, code):
-        AST = self.parser.parse(bytes(code, encoding="utf-8"))
+        AST = self.parse(code)
         return not AST.root_node.has_error
 
     def see_tree(self, code):
-        AST = self.parser.parse(bytes(code, encoding="utf-8"))
+        AST = self.parse(code)
         root_node = AST.root_node
         node_list, edge_list = ast_bfs(root = root_node)
         dot = draw_tree("AST", node_list, edge_list)
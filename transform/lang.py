@@ -18,3 +18,18 @@ def set_expand(expand):
 
 def get_expand():
     return expand_config["expand"]
+
+
+query_config = {"get_query": None}
+
+
+def set_query(get_query):
+    query_config["get_query"] = get_query
+
+
+def get_query(name):
+    # Compiled tree-sitter query of the given name for the current language,
+    # or None when queries are disabled or the language has no such query
+    if query_config["get_query"] is None:
+        return None
+    return query_config["get_query"](name)
@@ -0,0 +1,51 @@
+from ist_utils import find_nodes, log_types
+from transform.lang import get_query
+
+# Tree-sitter queries that find the candidate nodes of the structural matchers
+# inside tree-sitter, keyed by query name and language. Every query captures
+# the candidate as @node; the matchers still run their own checks on it, so a
+# query only has to match a superset of what the matcher accepts.
+query_sources = {
+    "switch": {
+        "c": "(switch_statement) @node",
+        "java": "(switch_expression) @node",
+    },
+    "if": {
+        "c": '(if_statement condition: (parenthesized_expression (binary_expression operator: "=="))) @node',
+        "java": '(if_statement condition: (condition (binary_expression operator: "=="))) @node',
+    },
+    "for": {
+        "c": "(for_statement) @node",
+        "java": "(for_statement) @node",
+    },
+    "while": {
+        "c": "(while_statement) @node",
+        "java": "(while_statement) @node",
+    },
+    "do_while": {
+        "c": "(do_statement) @node",
+        "java": "(do_statement) @node",
+    },
+    "augmented_assignment": {
+        "c": '(assignment_expression operator: ["+=" "-=" "*=" "/=" "%=" "<<=" ">>=" "&=" "|=" "^="]) @node',
+        "java": '(assignment_expression operator: ["+=" "-=" "*=" "/=" "%=" "<<=" ">>=" "&=" "|=" "^="]) @node',
+    },
+    "non_augmented_assignment": {
+        "c": '(assignment_expression right: (binary_expression operator: ["+" "-" "*" "/" "%" "<<" ">>" "&" "|" "^"])) @node',
+        "java": '(assignment_expression right: (binary_expression operator: ["+" "-" "*" "/" "%" "<<" ">>" "&" "|" "^"])) @node',
+    },
+    "cmp": {
+        "c": '(binary_expression operator: [">" ">=" "<" "<=" "==" "!="]) @node',
+        "java": '(binary_expression operator: [">" ">=" "<" "<=" "==" "!="]) @node',
+    },
+}
+
+
+def query_nodes(root, name, types):
+    # Candidate nodes of the named query in the subtree of root, in preorder.
+    # Falls back to the nodes of the given types when there is no query.
+    query = get_query(name)
+    if query is None:
+        return find_nodes(root, types)
+    log_types(types)
+    return [node for node, capture in query.captures(root) if capture == "node"]
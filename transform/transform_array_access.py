@@ -1,7 +1,7 @@
 import os, sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from ist_utils import replace_from_blob, traverse_rec_func, text
+from ist_utils import replace_from_blob, traverse_rec_func, text, find_nodes
 from transform.lang import get_lang
 
 
@@ -55,14 +55,9 @@ def match_array(root):
             return dim < 4
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, "subscript_expression"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
 
     return res
 
@@ -78,14 +73,9 @@ def match_pointer(root):
             return dim < 4
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, "assignment_expression"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -1,7 +1,7 @@
 import os, sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from ist_utils import replace_from_blob, traverse_rec_func, text
+from ist_utils import replace_from_blob, traverse_rec_func, text, find_nodes
 from transform.lang import get_lang
 
 
@@ -66,14 +66,9 @@ def match_static_mem(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, "declaration"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
 
     return res
 
@@ -144,14 +139,9 @@ def match_dyn_mem(root):
         return rec_DynMemOneLine(node) or rec_DynMemTwoLine(node)
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
 
     return res
 
@@ -1,5 +1,6 @@
 from ist_utils import text
 from transform.lang import get_lang
+from transform.query import query_nodes
 
 
 def match_augmented_assignment(root):
@@ -28,13 +29,9 @@ def match_augmented_assignment(root):
             return True
         return False
 
-    def match(u):
+    for u in query_nodes(root, "augmented_assignment", "assignment_expression"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -58,13 +55,9 @@ def match_non_augmented_assignment(root):
             return True
         return False
 
-    def match(u):
+    for u in query_nodes(root, "non_augmented_assignment", "assignment_expression"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
 
     return res
 
@@ -1,4 +1,4 @@
-from ist_utils import text, print_children
+from ist_utils import text, print_children, find_nodes
 from transform.lang import get_lang, get_expand
 
 
@@ -50,54 +50,53 @@ def match_ifforwhile_has_bracket(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(
+        root, ["while_statement", "if_statement", "for_statement", "else_clause"]
+    ):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
 def match_ifforwhile_hasnt_bracket(root):
     res = []
 
-    def match(u):
-        if not get_expand():
-            if (
-                u.type
-                in ["while_statement", "if_statement", "for_statement", "else_clause"]
-                and "{" not in text(u)
-                and "}" not in text(u)
-            ):
+    if not get_expand():
+        for u in find_nodes(
+            root, ["while_statement", "if_statement", "for_statement", "else_clause"]
+        ):
+            if "{" not in text(u) and "}" not in text(u):
                 # print(text(u))
                 res.append(u)
 
-        elif get_expand():
+    elif get_expand():
+        skipped = None
+        for u in find_nodes(
+            root,
+            [
+                "while_statement",
+                "if_statement",
+                "for_statement",
+                "else_clause",
+                "return_statement",
+                "expression_statement",
+                "throw_statement",
+            ],
+        ):
+            # Nodes inside a skipped expression_statement are not visited
             if (
-                u.type
-                in [
-                    "while_statement",
-                    "if_statement",
-                    "for_statement",
-                    "else_clause",
-                    "return_statement",
-                    "expression_statement",
-                    "throw_statement",
-                ]
-                and text(u)[0] != "{"
+                skipped is not None
+                and skipped.start_byte <= u.start_byte
+                and u.end_byte <= skipped.end_byte
             ):
+                continue
+            if text(u)[0] != "{":
                 # There is only one 'expression_statement'
                 if u.type == "expression_statement":
                     if "expression_statement" in [t.type for t in res]:
-                        return
+                        skipped = u
+                        continue
                 res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -178,14 +177,9 @@ def count_has_ifforwhile_bracket(root):
             return False
 
         res = []
-
-        def match(u):
+        for u in find_nodes(root, block_mp[lang]):
             if check(u):
                 res.append(u)
-            for v in u.children:
-                match(v)
-
-        match(root)
         return len(res)
 
     nodes = match_ifforwhile_has_bracket(root)
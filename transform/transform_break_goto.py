@@ -1,4 +1,4 @@
-from ist_utils import text
+from ist_utils import text, find_nodes
 from transform.lang import get_lang
 
 
@@ -59,14 +59,9 @@ def match_break(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, "break_statement"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
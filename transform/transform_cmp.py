@@ -1,5 +1,6 @@
-from ist_utils import text, print_children
+from ist_utils import text, print_children, find_nodes
 from transform.lang import get_lang
+from transform.query import query_nodes
 
 
 def match_cmp(root):
@@ -15,13 +16,9 @@ def match_cmp(root):
             return True
         return False
 
-    def match(u):
+    for u in query_nodes(root, "cmp", "binary_expression"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
 
     return res
 
@@ -35,13 +32,9 @@ def match_bigger(root):
             return True
         return False
 
-    def match(u):
+    for u in find_nodes(root, "binary_expression"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
 
     return res
 
@@ -55,13 +48,9 @@ def match_smaller(root):
             return True
         return False
 
-    def match(u):
+    for u in find_nodes(root, "binary_expression"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
 
     return res
 
@@ -75,13 +64,9 @@ def match_equal(root):
             return True
         return False
 
-    def match(u):
+    for u in find_nodes(root, "binary_expression"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
 
     return res
 
@@ -95,13 +80,9 @@ def match_not_equal(root):
             return True
         return False
 
-    def match(u):
+    for u in find_nodes(root, "binary_expression"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
 
     return res
 
@@ -1,7 +1,7 @@
 import os, sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from ist_utils import get_indent, text, print_children
+from ist_utils import get_indent, text, print_children, find_nodes
 from transform.lang import get_lang
 
 
@@ -17,14 +17,10 @@ def match_function(root):
     def check(u):
         return u.type == function_map[lang]
 
-    def match(u):
+    res = []
+    for u in find_nodes(root, function_map[lang]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    res = []
-    match(root)
     return res
 
 
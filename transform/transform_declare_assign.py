@@ -4,9 +4,16 @@ from ist_utils import (
     text,
     print_children,
     get_indent,
+    find_nodes,
 )
 from transform.lang import get_lang
 
+declaration_map = {
+    "c": "declaration",
+    "java": "local_variable_declaration",
+    "c_sharp": "local_declaration_statement",
+}
+
 
 def get_declare_info(node):
     # Returns all types of variable names in the node code block and the node dictionary
@@ -91,14 +98,9 @@ def match_assign_merge(root):
             return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, declaration_map[get_lang()]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -137,14 +139,9 @@ def match_assign_split(root):
             return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, declaration_map[get_lang()]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -1,4 +1,4 @@
-from ist_utils import replace_from_blob, traverse_rec_func, text, get_indent
+from ist_utils import replace_from_blob, traverse_rec_func, text, get_indent, find_nodes
 from transform.lang import get_lang
 
 
@@ -85,14 +85,9 @@ def match_lines_merge(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, variable_declaration_map[lang]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
 
     return res
 
@@ -116,14 +111,9 @@ def match_lines_split(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
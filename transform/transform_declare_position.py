@@ -1,4 +1,4 @@
-from ist_utils import replace_from_blob, traverse_rec_func, text
+from ist_utils import replace_from_blob, traverse_rec_func, text, find_nodes
 from transform.lang import get_lang
 
 
@@ -93,14 +93,9 @@ def match_not_first(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, block_map[lang]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -118,14 +113,9 @@ def match_not_tmp(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, block_map[lang]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -1,5 +1,6 @@
 from ist_utils import text
 from transform.lang import get_lang
+from transform.query import query_nodes
 
 declaration_map = {
     "c": "declaration",
@@ -70,14 +71,9 @@ def match_for(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in query_nodes(root, "for", "for_statement"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -1,4 +1,4 @@
-from ist_utils import replace_from_blob, traverse_rec_func, text
+from ist_utils import replace_from_blob, traverse_rec_func, text, find_nodes
 from transform.lang import get_lang
 
 """=========================match========================"""
@@ -62,13 +62,9 @@ def match_not_left(root):
     def check(u):
         return rec_RightUpdate(u) or rec_AugmentedCrement(u) or rec_Assignment(u)
 
-    def match(u):
+    for u in find_nodes(root, ["update_expression", "assignment_expression"]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
 
     return res
 
@@ -79,13 +75,9 @@ def match_not_right(root):
     def check(u):
         return rec_LeftUpdate(u) or rec_AugmentedCrement(u) or rec_Assignment(u)
 
-    def match(u):
+    for u in find_nodes(root, ["update_expression", "assignment_expression"]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -95,13 +87,9 @@ def match_not_augment(root):
     def check(u):
         return rec_LeftUpdate(u) or rec_RightUpdate(u) or rec_Assignment(u)
 
-    def match(u):
+    for u in find_nodes(root, ["update_expression", "assignment_expression"]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -111,13 +99,9 @@ def match_not_assignment(root):
     def check(u):
         return rec_LeftUpdate(u) or rec_RightUpdate(u) or rec_AugmentedCrement(u)
 
-    def match(u):
+    for u in find_nodes(root, ["update_expression", "assignment_expression"]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -151,13 +135,9 @@ def count_right(root):
     def check(u):
         return rec_RightUpdate(u)
 
-    def match(u):
+    for u in find_nodes(root, "update_expression"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return len(res)
 
 
@@ -188,13 +168,9 @@ def count_left(root):
     def check(u):
         return rec_LeftUpdate(u)
 
-    def match(u):
+    for u in find_nodes(root, "update_expression"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return len(res)
 
 
@@ -220,13 +196,9 @@ def count_augment(root):
     def check(u):
         return rec_AugmentedCrement(u)
 
-    def match(u):
+    for u in find_nodes(root, "assignment_expression"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return len(res)
 
 
@@ -261,11 +233,7 @@ def count_assignment(root):
     def check(u):
         return rec_Assignment(u)
 
-    def match(u):
+    for u in find_nodes(root, "assignment_expression"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return len(res)
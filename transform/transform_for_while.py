@@ -1,6 +1,7 @@
 from ist_utils import text, print_children
 from collections import defaultdict
 from transform.lang import get_lang
+from transform.query import query_nodes
 
 declaration_map = {
     "c": "declaration",
@@ -66,14 +67,9 @@ def match_for(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in query_nodes(root, "for", "for_statement"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -84,14 +80,9 @@ def match_while(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in query_nodes(root, "while", "while_statement"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -102,14 +93,9 @@ def match_do_while(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in query_nodes(root, "do_while", "do_statement"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -1,21 +1,18 @@
+import re
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from ist_utils import text, get_indent
+from ist_utils import text, get_indent, find_nodes, TreeCache
 
-# 存储函数类型信息的字典
-function_type_cache = {}
+# 存储函数类型信息: function name -> return type, per tree
+function_type_cache = TreeCache("func_nested_function_type")
 
-# 存储声明信息的全局字典，值为列表类型
-declarations = {}
-
-# 存储变量信息的全局字典
-var_info_cache = {}
+# match_func_nested 收集的 (var_info_cache, declarations), per tree, read back by cvt_func_nested
+match_states = TreeCache("func_nested_match_state")
 
 
 def match_func_not_nested(root):
-    global declarations
     declarations = {}
 
     def check(node):
@@ -66,35 +63,37 @@ def match_func_not_nested(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, ["call_expression", "method_invocation"]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
 def match_func_nested(root):
-    global var_info_cache, declarations
-    # 清空
     matched_nodes = []
+    # 存储变量信息的字典
     var_info_cache = {}
+    # 存储声明信息的字典，值为列表类型
     declarations = {}
 
-    def collect_vars(u, scope=None):
-        current_scope = u if u.type == "compound_statement" or u.type == "block" else scope
-        if current_scope:
-            # 根据不同语言选择变量声明节点类型
-            from transform.lang import get_lang
-            lang = get_lang()
-            declaration_type = "declaration" if lang == "c" else "local_variable_declaration"
-            declarator_type = "init_declarator" if lang == "c" else "variable_declarator"
-
-            children = [c for c in u.children if c.type == declaration_type]
-            for child in children:
+    def scope_of(u):
+        # 最近的 compound_statement/block 祖先（含自身）
+        while u:
+            if u.type == "compound_statement" or u.type == "block":
+                return u
+            u = u.parent
+        return None
+
+    def collect_vars(root):
+        # 根据不同语言选择变量声明节点类型
+        from transform.lang import get_lang
+        lang = get_lang()
+        declaration_type = "declaration" if lang == "c" else "local_variable_declaration"
+        declarator_type = "init_declarator" if lang == "c" else "variable_declarator"
+
+        for child in find_nodes(root, declaration_type):
+            current_scope = scope_of(child.parent)
+            if current_scope:
                 id1 = None
                 call1 = None
                 for c in child.children:
@@ -108,8 +107,6 @@ def match_func_nested(root):
                     if id1 not in var_info_cache:
                         var_info_cache[id1] = []
                     var_info_cache[id1].append((child, call1, current_scope))
-        for v in u.children:
-            collect_vars(v, current_scope)
 
     def check_nested_call(node):
         # 检查是否有嵌套的函数调用
@@ -149,22 +146,33 @@ def match_func_nested(root):
                     return True
         return False
 
-    def match(u, scope=None):
-        current_scope = u if u.type == "compound_statement" or u.type == "block" else scope
+    def match(root):
         from transform.lang import get_lang
         lang = get_lang()
-        for c in u.children:
-            # 根据语言选择函数调用节点类型
-            call_type = "method_invocation" if lang == "java" else "call_expression"
-            if c.type == call_type:
-                # 检查是否有嵌套调用
-                if check_nested_call(c):
-                    matched_nodes.append(c)
-                # 检查函数调用的直接参数
-                if lang == "java":
-                    args = c.child_by_field_name("arguments")
-                    if args and args.type == "argument_list":
-                        for param in args.children:
+        # 根据语言选择函数调用节点类型
+        call_type = "method_invocation" if lang == "java" else "call_expression"
+        for c in find_nodes(root, call_type):
+            current_scope = scope_of(c.parent)
+            # 检查是否有嵌套调用
+            if check_nested_call(c):
+                matched_nodes.append(c)
+            # 检查函数调用的直接参数
+            if lang == "java":
+                args = c.child_by_field_name("arguments")
+                if args and args.type == "argument_list":
+                    for param in args.children:
+                        if param.type == "identifier" and text(param) in var_info_cache:
+                            # 检查变量是否在同一作用域内
+                            for var_node, _, var_scope in var_info_cache[text(param)]:
+                                if var_scope == current_scope:
+                                    matched_nodes.append(c)
+                                    if str(var_node) not in declarations:
+                                        declarations[str(var_node)] = []
+                                    declarations[str(var_node)].append(c)
+            else:
+                for arg in c.children:
+                    if arg.type == "argument_list":
+                        for param in arg.children:
                             if param.type == "identifier" and text(param) in var_info_cache:
                                 # 检查变量是否在同一作用域内
                                 for var_node, _, var_scope in var_info_cache[text(param)]:
@@ -173,35 +181,23 @@ def match_func_nested(root):
                                         if str(var_node) not in declarations:
                                             declarations[str(var_node)] = []
                                         declarations[str(var_node)].append(c)
-                else:
-                    for arg in c.children:
-                        if arg.type == "argument_list":
-                            for param in arg.children:
-                                if param.type == "identifier" and text(param) in var_info_cache:
-                                    # 检查变量是否在同一作用域内
-                                    for var_node, _, var_scope in var_info_cache[text(param)]:
-                                        if var_scope == current_scope:
-                                            matched_nodes.append(c)
-                                            if str(var_node) not in declarations:
-                                                declarations[str(var_node)] = []
-                                            declarations[str(var_node)].append(c)
-                        elif arg.type == "identifier" and text(arg) in var_info_cache:
-                            # 检查变量是否在同一作用域内
-                            for var_node, _, var_scope in var_info_cache[text(arg)]:
-                                if var_scope == current_scope:
-                                    matched_nodes.append(c)
-                                    if str(var_node) not in declarations:
-                                        declarations[str(var_node)] = []
-                                    declarations[str(var_node)].append(c)
-        for v in u.children:
-            match(v, current_scope)
+                    elif arg.type == "identifier" and text(arg) in var_info_cache:
+                        # 检查变量是否在同一作用域内
+                        for var_node, _, var_scope in var_info_cache[text(arg)]:
+                            if var_scope == current_scope:
+                                matched_nodes.append(c)
+                                if str(var_node) not in declarations:
+                                    declarations[str(var_node)] = []
+                                declarations[str(var_node)].append(c)
 
     collect_vars(root)
     match(root)
+    match_states.set(root, (var_info_cache, declarations))
     return matched_nodes
 
 
 def cvt_func_nested(node, code):
+    var_info_cache, declarations = match_states.get(node, ({}, {}))
     # 获取函数调用中使用的变量信息
     id1 = None
     call1 = None
@@ -308,15 +304,18 @@ def cvt_func_nested(node, code):
     return None
 
 
+def next_temp_index(code):
+    return max((int(n) + 1 for n in re.findall(r"\btemp_result_(\d+)\b", code)), default=0)
+
+
 def cvt_func_not_nested(node, code):
     result = extract_nested_call(node)
     if result:
         delete = []
         inserts = []
         declarations = set()  # 使用集合来避免重复声明
-        global temp_var_counter
-        if not 'temp_var_counter' in globals():
-            temp_var_counter = 0
+        # Numbered after the temp_result_N already in the code, so the names only depend on the code
+        temp_var_counter = next_temp_index(code)
         # 根据编程语言选择变量声明方式
         from transform.lang import get_lang
         lang = get_lang()
@@ -447,23 +446,15 @@ def count_func_nested(root):
                     return True
         return False
 
-    def traverse(u):
-        nonlocal count
-        # 获取当前编程语言
-        from transform.lang import get_lang
-        lang = get_lang()
-
-        # 检查当前节点是否为函数调用
-        if (lang == "java" and u.type == "method_invocation") or \
-                (lang != "java" and u.type == "call_expression"):
-            if check_nested_call(u):
-                count += 1
-
-        # 递归遍历子节点
-        for v in u.children:
-            traverse(v)
+    # 获取当前编程语言
+    from transform.lang import get_lang
+    lang = get_lang()
 
-    traverse(root)
+    # 检查每个函数调用节点
+    call_type = "method_invocation" if lang == "java" else "call_expression"
+    for u in find_nodes(root, call_type):
+        if check_nested_call(u):
+            count += 1
     return count
 
 
@@ -484,18 +475,23 @@ def count_func_not_nested(root):
                 return True
         return False
 
-    def traverse(u):
-        nonlocal count
+    for u in find_nodes(root, ["call_expression", "method_invocation"]):
         if check(u):
             count += 1
-        for v in u.children:
-            traverse(v)
-
-    traverse(root)
     return count
 
 
 def get_function_return_type(root, function_name):
+    types = function_type_cache.get(root)
+    if types is None:
+        types = {}
+        function_type_cache.set(root, types)
+    if function_name not in types:
+        types[function_name] = find_function_return_type(root, function_name)
+    return types[function_name]
+
+
+def find_function_return_type(root, function_name):
     # 获取当前编程语言
     from transform.lang import get_lang
     lang = get_lang()
@@ -4,7 +4,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 import re
 import inflection
 from transformers import BertTokenizer
-from ist_utils import text, parent, cpp_keywords
+from ist_utils import text, parent, cpp_keywords, find_nodes
 from transform.lang import get_lang
 import random
 
@@ -14,18 +14,18 @@ tokenizer = None
 def match_identifier(root):
     parameter_declaration_sons = {}
 
-    def find_for_statement_identifier(u, arg, st):
-        if u.type == "for_statement":
-            arg["in"] = True
-        if arg["in"] and u.type == "identifier":
-            st.add(u.id)
-        for v in u.children:
-            find_for_statement_identifier(v, arg, st)
-        if u.type == "for_statement":
-            arg["in"] = False
-
+    # Identifiers inside the most recently entered for statement
     for_statement_identifiers_ids = set()
-    find_for_statement_identifier(root, {"in": False}, for_statement_identifiers_ids)
+    for_node = None
+    for u in find_nodes(root, ["for_statement", "identifier"]):
+        if u.type == "for_statement":
+            for_node = u
+        elif (
+            for_node is not None
+            and for_node.start_byte <= u.start_byte
+            and u.end_byte <= for_node.end_byte
+        ):
+            for_statement_identifiers_ids.add(u.id)
 
     if get_lang() == "c":
 
@@ -81,15 +81,15 @@ def match_identifier(root):
                 return False
             return True
 
+    identifier_types = {
+        "c": ["identifier", "field_identifier"],
+        "java": "identifier",
+        "c_sharp": "identifier",
+    }
     res = []
-
-    def match(u):
+    for u in find_nodes(root, identifier_types[get_lang()]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     res = [node for node in res if text(node) in parameter_declaration_sons]
     return res
 
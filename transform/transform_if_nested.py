@@ -1,4 +1,4 @@
-from ist_utils import text, print_children
+from ist_utils import text, print_children, find_nodes
 from transform.lang import get_lang
 
 return_text = None
@@ -39,14 +39,9 @@ def match_if_split(root):
         return True
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, "if_statement"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -1,4 +1,4 @@
-from ist_utils import text, print_children
+from ist_utils import text, print_children, find_nodes
 from transform.lang import get_lang
 
 return_text = None
@@ -21,12 +21,11 @@ def get_indent(start_byte, code):
 
 def match_if_return(root):
     def find_return_node(u):
-        if u.type == "return_statement":
-            global return_text
-            return_text = text(u)
-            return
-        for v in u.children:
-            find_return_node(v)
+        last = None
+        for v in find_nodes(u, "return_statement"):
+            if last is None or v.start_byte >= last.end_byte:
+                last = v
+        return last
 
     global return_text
     return_text = None
@@ -34,7 +33,9 @@ def match_if_return(root):
     if primitive_type == "void":
         return_text = "return void();"
     else:
-        find_return_node(root)
+        return_node = find_return_node(root)
+        if return_node is not None:
+            return_text = text(return_node)
         if return_text is None:
             return_text = "return void();"
 
@@ -52,14 +53,9 @@ def match_if_return(root):
         return True
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, "if_statement"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -1,5 +1,6 @@
 from ist_utils import text, print_children
 from transform.lang import get_lang
+from transform.query import query_nodes
 
 return_text = None
 
@@ -28,14 +29,9 @@ def match_switch(root):
         return True
 
     res = []
-
-    def match(u):
+    for u in query_nodes(root, "switch", switch_mapping[get_lang()]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
@@ -72,14 +68,9 @@ def match_if(root):
         return ok[0]
 
     res = []
-
-    def match(u):
+    for u in query_nodes(root, "if", "if_statement"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     vis = [0 for _ in range(len(res))]
     for i in range(len(res)):
         for j in range(len(res)):
@@ -136,7 +127,7 @@ def cvt_if2switch(node, code):
     block_nodes = []
     default_node = []
 
-    def find_nodes(u):
+    def collect_branches(u):
         if u.type == "if_statement":
             cond_node = u.children[1].children[1]
             if len(cond_node.children) <= 2:
@@ -149,9 +140,9 @@ def cvt_if2switch(node, code):
         if u.type == "else_clause" and u.children[1].type != "if_statement":
             default_node.append(u.children[1])
         for v in u.children:
-            find_nodes(v)
+            collect_branches(v)
 
-    find_nodes(node)
+    collect_branches(node)
     if len(default_node) == 0:
         return
     default_node = default_node[0]
@@ -1,7 +1,7 @@
 import os, sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from ist_utils import replace_from_blob, traverse_rec_func, text
+from ist_utils import replace_from_blob, traverse_rec_func, text, find_nodes
 from transform.lang import get_lang
 import random
 
@@ -51,14 +51,9 @@ def match_invichar_identifier(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, "identifier"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
 
     return res
 
@@ -1,4 +1,4 @@
-from ist_utils import text, get_indent
+from ist_utils import text, get_indent, find_nodes
 from transform.lang import get_lang
 
 declaration_map = {"c": "declaration", "java": "local_variable_declaration"}
@@ -45,14 +45,9 @@ def match_for_while(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, ["for_statement", "while_statement"]):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
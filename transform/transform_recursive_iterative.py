@@ -1,7 +1,7 @@
 import sys, os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from ist_utils import text, get_indent, replace_from_blob
+from ist_utils import text, get_indent, replace_from_blob, find_nodes
 from transform.lang import get_lang
 import re
 
@@ -374,9 +374,6 @@ def match_recursive_functions(root):
                     "recursion_locations": []
                 }
 
-        for child in node.children:
-            collect_functions(child)
-
     # 第二步：检查每个函数是否递归调用自身
     def check_recursion(node, func_name):
         # 添加语言检测
@@ -411,7 +408,8 @@ def match_recursive_functions(root):
         return recursive_funcs[func_name]["is_recursive"]
 
     # 其余代码保持不变
-    collect_functions(root)
+    for node in find_nodes(root, ["function_definition", "method_declaration"]):
+        collect_functions(node)
 
     for func_name, info in recursive_funcs.items():
         check_recursion(info["node"], func_name)
@@ -589,9 +587,6 @@ def match_iterative_functions(root):
                     "pattern": None
                 }
 
-        for child in node.children:
-            collect_functions(child)
-
     # 第二步：检查每个函数是否包含循环且不递归调用自身
     def check_loop(node, func_info):
         if node.type in ["for_statement", "while_statement", "do_statement"]:
@@ -660,7 +655,8 @@ def match_iterative_functions(root):
         return False
 
     # 其余代码保持不变
-    collect_functions(root)
+    for node in find_nodes(root, ["function_definition", "method_declaration"]):
+        collect_functions(node)
 
     for func_name, info in iterative_funcs.items():
         check_loop(info["node"], info)
@@ -1,7 +1,7 @@
 import os, sys
 import re
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from ist_utils import replace_from_blob, traverse_rec_func, text, get_indent
+from ist_utils import replace_from_blob, traverse_rec_func, text, get_indent, find_nodes
 from transform.lang import get_lang
 
 
@@ -228,20 +228,21 @@ def match_if_to_ternary(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, "if_statement"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 
 def match_ternary_to_if(root):
     """Match ternary operator expressions that can be converted to if-else statements"""
     lang = get_lang()
+    declaration_types = [
+        "declaration",  # C
+        "variable_declaration",  # Java
+        "local_variable_declaration",  # Java
+        "field_declaration",  # Java
+    ]
 
     def check(node):
 
@@ -266,13 +267,6 @@ def match_ternary_to_if(root):
                 return True
 
 
-        declaration_types = [
-            "declaration",  # C
-            "variable_declaration",  # Java
-            "local_variable_declaration",  # Java
-            "field_declaration",  # Java
-        ]
-
         if node.type in declaration_types:
             # 检查源代码是否包含问号和冒号
             if has_ternary_in_source(text(node)):
@@ -322,14 +316,11 @@ def match_ternary_to_if(root):
         return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(
+        root, ["assignment_expression", "return_statement"] + declaration_types
+    ):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     return res
 
 """==========================replace========================"""
@@ -1,10 +1,11 @@
 import os, sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from ist_utils import text
+from ist_utils import text, find_nodes, TreeCache
 import random
 
-record = {}
+# Where the matched tree's names get their rb/sh, chosen by the matcher
+insert_positions = TreeCache("tokensub_insert_position")
 
 
 def match_tokensub_identifier(root, select=True):
@@ -22,14 +23,9 @@ def match_tokensub_identifier(root, select=True):
         return False
 
     res = []
-
-    def match(u):
+    for u in find_nodes(root, "identifier"):
         if check(u):
             res.append(u)
-        for v in u.children:
-            match(v)
-
-    match(root)
     res = [node for node in res if text(node) in parameter_declaration_sons]
     if select:
         res = [node for node in res if len(text(node)) > 0]
@@ -41,12 +37,12 @@ def match_tokensub_identifier(root, select=True):
             for node in res
             if len(text(node)) > 0 and text(node) == selected_var_name
         ]
-        record["insert_position"] = random.choice(["suffix", "prefix"])
+        insert_positions.set(root, random.choice(["suffix", "prefix"]))
     return res
 
 
 def convert_tokensub_rb(node):
-    if record["insert_position"] == "suffix":
+    if insert_positions.get(node, "suffix") == "suffix":
         return [
             (node.end_byte, node.start_byte),
             (node.start_byte, "_".join([text(node), "rb"])),
@@ -59,7 +55,7 @@ def convert_tokensub_rb(node):
 
 
 def convert_tokensub_sh(node):
-    if record["insert_position"] == "suffix":
+    if insert_positions.get(node, "suffix") == "suffix":
         return [
             (node.end_byte, node.start_byte),
             (node.start_byte, "_".join([text(node), "sh"])),
@@ -0,0 +1,211 @@
+import io
+import os
+import csv
+import json
+import shutil
+from typing import List, Optional
+
+# Fields stored as integers by the columnar formats, every other field is a string
+int_fields = ["target", "idx"]
+
+
+def open_output(output_path: str, offset: Optional[int] = None):
+    # Binary file for writing output_path. With an offset, the output is cut to
+    # offset bytes and written after them.
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if offset is not None and os.path.exists(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(offset)
+        return open(output_path, "ab")
+    return open(output_path, "wb")
+
+
+class JsonlWriter:
+    # One json object per line
+    resumable = True
+
+    def __init__(self, output_path: str, offset: Optional[int] = None):
+        self.f = open_output(output_path, offset)
+
+    def write(self, item: dict):
+        self.f.write((json.dumps(item) + "\n").encode("utf-8"))
+
+    def sync(self) -> int:
+        # Make the records written so far durable, returning the size of the output
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return self.f.tell()
+
+    def close(self):
+        self.f.close()
+
+
+class CsvWriter(JsonlWriter):
+    # csv with a header row, the columns being the fields of the first record,
+    # written with the stdlib csv module one row at a time
+    def __init__(self, output_path: str, offset: Optional[int] = None):
+        self.fieldnames = None
+        if offset and os.path.exists(output_path):
+            # Resuming, the header is already in the file
+            with open(output_path, "r", encoding="utf-8", newline="") as f:
+                self.fieldnames = next(csv.reader(f), None)
+        super().__init__(output_path, offset)
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator="\n")
+
+    def write(self, item: dict):
+        if self.fieldnames is None:
+            self.fieldnames = list(item.keys())
+            self.writer.writerow(self.fieldnames)
+        self.writer.writerow([item.get(k) for k in self.fieldnames])
+        self.f.write(self.buffer.getvalue().encode("utf-8"))
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+
+class ArrowWriter:
+    # Collects records into Arrow record batches of batch_size rows, the schema
+    # being taken from the first record. Subclasses write the batches.
+    resumable = False
+
+    def __init__(self, output_path: str, offset: Optional[int] = None, batch_size: int = 10000):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.output_path = output_path
+        self.batch_size = batch_size
+        self.rows = []
+        self.schema = None
+
+    def write(self, item: dict):
+        if self.schema is None:
+            self.schema = self.pa.schema([
+                (k, self.pa.int32() if k in int_fields else self.pa.string()) for k in item
+            ])
+        # Values are converted to the type of their column as datasets'
+        # Features.encode_batch does, e.g. an int label becomes "1"
+        self.rows.append({k: self.encode(k, v) for k, v in item.items()})
+        if len(self.rows) >= self.batch_size:
+            self.flush_rows()
+
+    def encode(self, field: str, value):
+        if value is None:
+            return None
+        return int(value) if field in int_fields else str(value)
+
+    def flush_rows(self):
+        if self.rows:
+            self.write_batch(self.pa.RecordBatch.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def write_batch(self, batch):
+        raise NotImplementedError
+
+
+class ParquetWriter(ArrowWriter):
+    # Parquet file with a row group per batch
+    def __init__(self, output_path: str, offset: Optional[int] = None, batch_size: int = 10000):
+        super().__init__(output_path, offset, batch_size)
+        import pyarrow.parquet as pq
+
+        self.pq = pq
+        self.writer = None
+
+    def write_batch(self, batch):
+        if self.writer is None:
+            if os.path.dirname(self.output_path):
+                os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+            self.writer = self.pq.ParquetWriter(self.output_path, batch.schema)
+        self.writer.write_batch(batch)
+
+    def close(self):
+        self.flush_rows()
+        if self.writer is None:
+            # No records, still leave a (schema-less) parquet file
+            self.pq.write_table(self.pa.table({}), self.output_path)
+        else:
+            self.writer.close()
+
+
+class DatasetWriter(ArrowWriter):
+    # HuggingFace dataset saved with save_to_disk. The batches are streamed into
+    # an Arrow file next to the output, which the dataset memory-maps, so the
+    # records are never all in memory.
+    def __init__(self, output_path: str, offset: Optional[int] = None, batch_size: int = 10000):
+        super().__init__(output_path, offset, batch_size)
+        self.arrow_path = output_path.rstrip("/\\") + ".arrow.tmp"
+        self.sink = None
+        self.writer = None
+
+    def write_batch(self, batch):
+        if self.writer is None:
+            if os.path.dirname(self.arrow_path):
+                os.makedirs(os.path.dirname(self.arrow_path), exist_ok=True)
+            self.sink = self.pa.OSFile(self.arrow_path, "wb")
+            self.writer = self.pa.ipc.new_stream(self.sink, batch.schema)
+        self.writer.write_batch(batch)
+
+    def close(self):
+        from datasets import Dataset
+
+        self.flush_rows()
+        if self.writer is None:
+            Dataset.from_list([]).save_to_disk(self.output_path)
+            return
+        self.writer.close()
+        self.sink.close()
+        dataset = Dataset.from_file(self.arrow_path)
+        dataset.save_to_disk(self.output_path)
+        del dataset
+        os.remove(self.arrow_path)
+
+
+output_writers = {
+    "jsonl": JsonlWriter,
+    "csv": CsvWriter,
+    "parquet": ParquetWriter,
+    "dataset": DatasetWriter,
+}
+
+
+def merge_parts(parts: List[str], output_path: str, output_format: str):
+    # Concatenate the outputs of the parts of a sharded run into output_path
+    if output_format in ("jsonl", "csv"):
+        header = None
+        with open_output(output_path) as out:
+            for part in parts:
+                with open(part, "rb") as f:
+                    if output_format == "csv":
+                        # Every part starts with the header, which is kept once
+                        line = f.readline()
+                        if header is None and line:
+                            header = line
+                            out.write(line)
+                    shutil.copyfileobj(f, out, 1 << 20)
+    elif output_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if os.path.dirname(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        writer = None
+        for part in parts:
+            part_file = pq.ParquetFile(part)
+            if part_file.metadata.num_columns == 0:
+                continue
+            for batch in part_file.iter_batches():
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, batch.schema)
+                writer.write_batch(batch)
+        if writer is None:
+            # No records in any part, the same empty file as ParquetWriter leaves
+            pq.write_table(pa.table({}), output_path)
+        else:
+            writer.close()
+    elif output_format == "dataset":
+        from datasets import concatenate_datasets, load_from_disk
+
+        concatenate_datasets([load_from_disk(part) for part in parts]).save_to_disk(output_path)
+    else:
+        raise ValueError(f"Unknown output format '{output_format}'.")